@@ -0,0 +1,213 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module with local agent that executes commands on behalf of the CLI.
+
+Agent is a long running process that listens on a Unix socket and owns a
+single :obj:`Client` with pooled connections, a resource cache and a shared
+job poller. Command line client forwards commands to the agent when it is
+running, which means that many concurrent invocations share one connection
+pool and one polling loop.
+
+Protocol is line based. Client sends a single JSON document with ``argv``
+and ``config`` keys and receives a single JSON document with ``code``,
+``stdout`` and ``stderr`` keys. If agent cannot execute the command, it
+responds with a ``fallback`` key and the client executes command itself.
+
+Agent runs commands with the credentials of its owner, so the socket is
+only accessible to the owner and, where the platform can tell, connections
+from processes of other users are rejected.
+"""
+
+import json
+import logging
+import os
+import socket
+import struct
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from fcoclient import cli
+from fcoclient.exceptions import FCOError
+
+
+def forward(path, argv, config):
+    """
+    Execute command in agent.
+
+    Args:
+        path (str): Path to the agent's socket.
+        argv: Command line arguments (without program name).
+        config (str): Path to configuration file that command should use.
+
+    Returns:
+        Dictionary with ``code``, ``stdout`` and ``stderr`` keys or ``None``
+        if agent is not available or refused to execute the command.
+
+    Raises:
+        FCOError: If connection to agent broke after command has been sent.
+            Command might have been executed in this case.
+    """
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        return None
+
+    request = dict(argv=argv, config=os.path.abspath(config))
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(path)
+        except socket.error:
+            return None
+        try:
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as f:
+                response = json.loads(f.readline().decode("utf-8"))
+        except (socket.error, ValueError):
+            raise FCOError("Lost connection to agent while executing command")
+    finally:
+        sock.close()
+
+    if response.get("fallback"):
+        return None
+    return response
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode("utf-8"))
+            argv, config = request["argv"], request["config"]
+        except (ValueError, KeyError):
+            response = dict(fallback=True, reason="Malformed request")
+        else:
+            try:
+                response = self.server.execute(argv, config)
+            except Exception as e:
+                self.server.logger.exception("Command failed")
+                response = dict(code=1, stdout="",
+                                stderr="[ERROR] - {}\n".format(e))
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class AgentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Server that executes forwarded commands using shared client.
+
+    Each connection is served by a separate thread.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path, client, config, logger):
+        """
+        Construct agent server.
+
+        Args:
+            path (str): Path to the socket that server listens on.
+            client (:obj:`Client`): Shared client.
+            config (str): Path to configuration file that ``client`` was
+                created from. Commands that use other configuration files
+                are not executed by this agent.
+            logger: Logger that receives information about served commands.
+
+        Raises:
+            FCOError: If platform does not support Unix sockets.
+        """
+        if not hasattr(socket, "AF_UNIX"):
+            raise FCOError("Agent requires support for Unix sockets")
+
+        if os.path.exists(path):
+            os.unlink(path)
+        socketserver.UnixStreamServer.__init__(self, path, _Handler)
+        self.client = client
+        self.config = os.path.abspath(config)
+        self.logger = logger
+
+    def server_bind(self):
+        # Restrictive umask leaves no window in which other users could
+        # connect to the socket before its permissions are fixed.
+        umask = os.umask(0o077)
+        try:
+            socketserver.UnixStreamServer.server_bind(self)
+        finally:
+            os.umask(umask)
+        os.chmod(self.server_address, 0o600)
+
+    def verify_request(self, request, client_address):
+        if not hasattr(socket, "SO_PEERCRED"):
+            return True
+        size = struct.calcsize("3i")
+        credentials = request.getsockopt(socket.SOL_SOCKET,
+                                         socket.SO_PEERCRED, size)
+        _, uid, _ = struct.unpack("3i", credentials)
+        if uid != os.getuid():
+            msg = "Rejected connection from user {}"
+            self.logger.warning(msg.format(uid))
+            return False
+        return True
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+    def execute(self, argv, config):
+        """
+        Execute command.
+
+        Args:
+            argv: Command line arguments (without program name).
+            config (str): Absolute path to configuration file.
+
+        Returns:
+            Response document.
+        """
+        if config != self.config:
+            return dict(fallback=True, reason="Configuration mismatch")
+
+        try:
+            args = cli.create_parser(argv).parse_args(argv)
+        except SystemExit:
+            return dict(fallback=True, reason="Invalid arguments")
+        if not args.cls.forwardable:
+            return dict(fallback=True, reason="Command cannot be forwarded")
+
+        self.logger.info("Executing '{}'".format(" ".join(argv)))
+        out = StringIO()
+        err = StringIO()
+        code = cli.execute(args, self.client, self._create_logger(err), out)
+        self.logger.info("Command '{}' exited with {}".format(" ".join(argv),
+                                                              code))
+        return dict(code=code, stdout=out.getvalue(), stderr=err.getvalue())
+
+    @staticmethod
+    def _create_logger(stream):
+        handler = logging.StreamHandler(stream)
+        fmt = logging.Formatter("[%(levelname)s] - %(message)s")
+        handler.setFormatter(fmt)
+        logger = logging.Logger("fcoclient.agent.request")
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        return logger
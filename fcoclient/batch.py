@@ -0,0 +1,315 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module with batch execution of operations.
+
+Batch is a sequence of JSON documents, one per line. Each document describes
+single operation::
+
+    {"resource": "disk", "action": "create", "skeleton": {...}}
+    {"resource": "server", "action": "create", "skeleton": {...},
+     "keys": ["SSH KEY UUID"]}
+    {"resource": "server", "action": "start", "uuid": "SERVER UUID"}
+    {"resource": "server", "action": "delete", "uuid": "...", "cascade": true}
+    {"resource": "firewalltemplate", "action": "apply", "uuid": "...",
+     "address": "10.0.0.1"}
+
+Optional ``id`` field is copied into the result of the operation. Ids must
+be unique within the batch, operations that repeat an id are reported as
+failed and are not executed.
+
+When batch is executed with a :obj:`Journal`, progress of each operation is
+recorded and rerunning the same batch resumes it: operations that finished
+successfully are skipped and operations that were submitted but not waited
+for are re-attached to their jobs. Operations are identified by their ``id``
+field or, if it is missing, by the content of the line.
+"""
+
+import hashlib
+import json
+import threading
+
+from concurrent import futures
+
+from fcoclient.exceptions import FCOError
+from fcoclient.resources.base import ResourceType
+from fcoclient.resources.job import JobPoller
+
+
+class Operation(object):
+    """
+    Single operation from batch.
+    """
+
+    actions = ("create", "delete", "start", "stop", "apply")
+    resources = tuple(t.name for t in ResourceType
+                      if t not in (ResourceType.any, ResourceType.job))
+
+    def __init__(self, line, data):
+        """
+        Construct operation.
+
+        Args:
+            line (int): Line number of the operation in batch.
+            data (dict): Operation description.
+
+        Raises:
+            FCOError: If operation description is not valid.
+        """
+        self.line = line
+        self.data = data
+        self.id = data.get("id")
+        self.key = None
+        """str: Key that identifies operation in journal."""
+        self.resource = data.get("resource")
+        self.action = data.get("action")
+
+        if self.resource not in self.resources:
+            raise FCOError("Invalid resource: {}".format(self.resource))
+        if self.action not in self.actions:
+            raise FCOError("Invalid action: {}".format(self.action))
+
+    @staticmethod
+    def parse(line, text):
+        """
+        Parse operation from a line of text.
+
+        Args:
+            line (int): Line number.
+            text (str): JSON document.
+
+        Returns:
+            :obj:`Operation`: Parsed operation.
+
+        Raises:
+            FCOError: If line does not contain valid operation.
+        """
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise FCOError("Invalid JSON: {}".format(e))
+        if not isinstance(data, dict):
+            raise FCOError("Operation must be JSON object")
+        return Operation(line, data)
+
+    @property
+    def digest(self):
+        """
+        Digest of the operation's content.
+        """
+        text = json.dumps(self.data, sort_keys=True).encode("utf-8")
+        return hashlib.sha1(text).hexdigest()
+
+    def run(self, client):
+        """
+        Submit operation to FCO.
+
+        Args:
+            client (:obj:`Client`): Client to use.
+
+        Returns:
+            :obj:`Job`: Job that tracks the operation.
+
+        Raises:
+            FCOError: If operation cannot be executed.
+        """
+        resource_client = getattr(client, self.resource)
+        method = getattr(resource_client, self.action, None)
+        if method is None:
+            msg = "Action {} is not supported for {}"
+            raise FCOError(msg.format(self.action, self.resource))
+
+        try:
+            if self.action == "create":
+                if self.resource == "server":
+                    return method(self.data["skeleton"],
+                                  self.data.get("keys", []))
+                return method(self.data["skeleton"])
+            if self.action == "delete":
+                return method(self.data["uuid"],
+                              cascade=self.data.get("cascade", False))
+            if self.action == "apply":
+                return method(self.data["uuid"], self.data["address"])
+            return method(self.data["uuid"])
+        except KeyError as e:
+            raise FCOError("Missing field: {}".format(e))
+
+    def result(self, **fields):
+        """
+        Construct result record for this operation.
+        """
+        result = dict(line=self.line, **fields)
+        if self.id is not None:
+            result["id"] = self.id
+        return result
+
+
+class BatchRunner(object):
+    """
+    Executes batch of operations using single client.
+
+    Operations are submitted concurrently and their jobs are waited for by a
+    single :obj:`JobPoller`, which means that waiting for many jobs costs one
+    list request per polling round.
+    """
+
+    def __init__(self, client, max_workers=8, wait=True, poll_interval=5,
+                 journal=None, retry_unknown=False):
+        """
+        Construct batch runner.
+
+        Args:
+            client (:obj:`Client`): Client to use.
+            max_workers (int): Number of concurrently submitted operations.
+            wait (bool): Wait for jobs to terminate.
+            poll_interval (float): Number of seconds between job polls. Only
+                used if client does not have job poller set already.
+            journal (:obj:`Journal`): Journal that records progress.
+            retry_unknown (bool): Resubmit operations that were being
+                submitted when previous run was interrupted. By default, such
+                operations are reported as failed, since FCO might have
+                accepted them.
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self.wait = wait
+        self.poll_interval = poll_interval
+        self.journal = journal
+        self.retry_unknown = retry_unknown
+        self._lock = threading.Lock()
+        self._failed = 0
+
+    def run(self, lines, report):
+        """
+        Execute operations.
+
+        Args:
+            lines: Iterable of lines of text, one operation per line. Empty
+                lines are skipped.
+            report: Callable that receives a result dictionary for each
+                operation, as soon as the operation finishes. Calls are
+                serialized.
+
+        Returns:
+            Number of operations that failed.
+        """
+        self._failed = 0
+        poller = self.client.job.poller
+        if poller is None:
+            poller = JobPoller(self.client.job, self.poll_interval)
+
+        submissions = []
+        seen = {}
+        with futures.ThreadPoolExecutor(self.max_workers) as executor:
+            for line, text in enumerate(lines, 1):
+                if len(text.strip()) == 0:
+                    continue
+                try:
+                    op = Operation.parse(line, text)
+                except FCOError as e:
+                    self._report(report, dict(line=line, error=str(e)), True)
+                    continue
+                if op.id is not None:
+                    op.key = "id:{}".format(op.id)
+                    if op.key in seen:
+                        error = "Duplicate id: {}".format(op.id)
+                        self._report(report, op.result(error=error), True)
+                        continue
+                    seen[op.key] = 1
+                else:
+                    digest = op.digest
+                    seen[digest] = seen.get(digest, 0) + 1
+                    op.key = "{}#{}".format(digest, seen[digest])
+                submissions.append(
+                    executor.submit(self._submit, op, poller, report)
+                )
+
+        waits = {}
+        for submission in submissions:
+            op, future = submission.result()
+            if future is not None:
+                waits.setdefault(future, []).append(op)
+        for future in futures.as_completed(waits):
+            for op in waits[future]:
+                self._finish(op, future, report)
+        return self._failed
+
+    def _submit(self, op, poller, report):
+        entry = None if self.journal is None else self.journal.get(op.key)
+        event = None if entry is None else entry["event"]
+
+        if event == "finished" and entry["status"] == "SUCCESSFUL":
+            self._report(report, op.result(job=entry["job"],
+                                           status=entry["status"],
+                                           skipped=True), False)
+            return op, None
+        if event == "submitted":
+            if not self.wait:
+                self._report(report, op.result(job=entry["job"],
+                                               skipped=True), False)
+                return op, None
+            return op, poller.submit(entry["job"])
+        if event == "submitting" and not self.retry_unknown:
+            error = "Unknown outcome of previous submission"
+            self._report(report, op.result(error=error), True)
+            return op, None
+
+        self._journal(op, "submitting")
+        try:
+            job = op.run(self.client)
+        except Exception as e:
+            # Malformed skeletons can fail with any exception and must only
+            # fail their own operation.
+            error = _describe_error(e)
+            self._journal(op, "failed", error=error)
+            self._report(report, op.result(error=error), True)
+            return op, None
+        self._journal(op, "submitted", job=job.uuid)
+
+        if not self.wait:
+            self._report(report, op.result(job=job.uuid,
+                                           status=job["status"]), False)
+            return op, None
+        return op, poller.submit(job.uuid)
+
+    def _finish(self, op, future, report):
+        try:
+            job = future.result()
+        except Exception as e:
+            self._report(report, op.result(error=_describe_error(e)), True)
+            return
+
+        self._journal(op, "finished", job=job.uuid, status=job["status"])
+        result = op.result(job=job.uuid, status=job["status"])
+        if job.status.marks_failure:
+            result["error"] = job.get("info")
+        self._report(report, result, job.status.marks_failure)
+
+    def _journal(self, op, event, **fields):
+        if self.journal is not None:
+            self.journal.record(op.key, event, line=op.line, **fields)
+
+    def _report(self, report, result, failed):
+        with self._lock:
+            if failed:
+                self._failed += 1
+            report(result)
+
+
+def _describe_error(error):
+    if isinstance(error, FCOError):
+        return str(error)
+    return "{}: {}".format(type(error).__name__, error)
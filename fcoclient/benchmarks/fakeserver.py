@@ -0,0 +1,311 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+In-process fake FCO REST server.
+
+Server implements the subset of FCO API that fcoclient uses: listing with
+filters and query limits, creating and deleting resources, changing server
+status, applying firewall templates and deleting jobs. Asynchronous
+operations return jobs that stay in progress for configured duration and
+apply their effects once they terminate.
+
+Server can also be run standalone, which is useful for trying out the
+command line client::
+
+    python -m fcoclient.benchmarks.fakeserver [-p PORT] [-n INVENTORY]
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import threading
+import time
+import uuid as uuidlib
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+PREFIX = "/rest/user/5.0/"
+
+DEFAULTS = {
+    "DISK": dict(productOfferUUID="disk-offer", size=20, vdcUUID="vdc",
+                 status="ATTACHED_TO_SERVER"),
+    "FIREWALL_TEMPLATE": dict(type="IPV4"),
+    "IMAGE": dict(vdcUUID="vdc"),
+    "NETWORK": dict(vdcUUID="vdc", networkType="IP"),
+    "NIC": dict(networkUUID="network", vdcUUID="vdc"),
+    "PRODUCTOFFER": dict(productAssociatedType="SERVER"),
+    "SERVER": dict(productOfferUUID="server-offer", vdcUUID="vdc",
+                   status="RUNNING", disks=[], nics=[]),
+    "SSHKEY": dict(globalKey=False, publicKey="ssh-rsa AAAA"),
+    "VDC": dict(),
+}
+"""Fields that generated resources of each type have."""
+
+
+class Inventory(object):
+    """
+    Thread-safe store of fake resources and jobs.
+    """
+
+    def __init__(self, job_duration=0.0):
+        """
+        Construct empty inventory.
+
+        Args:
+            job_duration (float): Number of seconds that jobs stay in
+                progress.
+        """
+        self.job_duration = job_duration
+        self._items = {}
+        self._effects = []
+        self._lock = threading.Lock()
+
+    def populate(self, resource_type, count, **fields):
+        """
+        Generate resources.
+
+        Args:
+            resource_type (str): FCO resource type (``SERVER``, ``DISK``,
+                ...).
+            count (int): Number of resources to generate.
+            **fields: Fields that override default values.
+
+        Returns:
+            List of UUIDs of generated resources.
+        """
+        uuids = []
+        with self._lock:
+            for i in range(count):
+                data = dict(DEFAULTS.get(resource_type, {}),
+                            resourceName="{}-{:06d}".format(
+                                resource_type.lower(), i))
+                data.update(fields)
+                uuids.append(self._add(resource_type, data)["resourceUUID"])
+        return uuids
+
+    def _add(self, resource_type, data):
+        data = dict(data, resourceType=resource_type)
+        data.setdefault("resourceUUID", str(uuidlib.uuid4()))
+        self._items.setdefault(resource_type, {})[data["resourceUUID"]] = data
+        return data
+
+    def _settle(self):
+        now = time.time()
+        pending = []
+        for deadline, job, effect in self._effects:
+            if deadline > now:
+                pending.append((deadline, job, effect))
+                continue
+            effect()
+            job.update(status="SUCCESSFUL", endTime=int(deadline * 1000))
+        self._effects = pending
+
+    def _job(self, resource_type, item_uuid, description, effect):
+        now = time.time()
+        job = self._add("JOB", dict(
+            resourceName="job", status="IN_PROGRESS", itemUUID=item_uuid,
+            itemType=resource_type, itemDescription=description, info="",
+            startTime=int(now * 1000), endTime=None,
+        ))
+        self._effects.append((now + self.job_duration, job, effect))
+        self._settle()
+        return dict(job)
+
+    def list(self, resource_type, search_filter, query_limit):
+        start, end = query_limit["from"], query_limit["to"]
+        with self._lock:
+            self._settle()
+            items = list(self._items.get(resource_type, {}).values())
+            for cond in search_filter.get("filterConditions", []):
+                field, values = cond["field"], cond["value"]
+                items = [i for i in items if i.get(field) in values]
+            items.sort(key=lambda i: i["resourceName"])
+            page = [dict(i) for i in items[start:end]]
+        return dict(list=page, totalCount=len(items))
+
+    def create(self, resource_type, body):
+        skeleton = next(v for k, v in body.items() if k.startswith("skeleton"))
+        item_uuid = str(uuidlib.uuid4())
+        data = dict(skeleton, resourceUUID=item_uuid)
+        with self._lock:
+            return self._job(resource_type, item_uuid, "Create",
+                             lambda: self._add(resource_type, data))
+
+    def delete(self, resource_type, item_uuid):
+        with self._lock:
+            if item_uuid not in self._items.get(resource_type, {}):
+                return None
+            if resource_type == "JOB":
+                del self._items[resource_type][item_uuid]
+                return {}
+            return self._job(
+                resource_type, item_uuid, "Delete",
+                lambda: self._items[resource_type].pop(item_uuid, None)
+            )
+
+    def change(self, resource_type, item_uuid, fields):
+        with self._lock:
+            item = self._items.get(resource_type, {}).get(item_uuid)
+            if item is None:
+                return None
+            return self._job(resource_type, item_uuid, "Modify",
+                             lambda: item.update(fields))
+
+    def count(self, resource_type):
+        with self._lock:
+            return len(self._items.get(resource_type, {}))
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, which would otherwise
+    # trigger delayed ACK stalls on persistent connections.
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length).decode("utf-8") or "null")
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+
+        if not self.path.startswith(PREFIX + "resources/"):
+            return self._respond(404, dict(error="Unknown endpoint"))
+        parts = self.path[len(PREFIX):].split("/")[1:]
+        inventory = self.server.inventory
+        result = None
+        if method == "POST" and parts[1:] == ["list"]:
+            return self._respond(200, inventory.list(
+                parts[0], body["searchFilter"], body["queryLimit"]
+            ))
+        elif method == "POST" and len(parts) == 1:
+            result = inventory.create(parts[0], body)
+        elif method == "DELETE" and len(parts) == 2:
+            result = inventory.delete(parts[0], parts[1])
+            if parts[0] == "JOB" and result is not None:
+                return self._respond(200, result)
+        elif method == "PUT" and parts[2:] == ["change_status"]:
+            result = inventory.change(parts[0], parts[1],
+                                      dict(status=body["newStatus"]))
+        elif method == "PUT" and parts[2:] == ["apply"]:
+            result = inventory.change(parts[0], parts[1], {})
+
+        if result is None:
+            return self._respond(404, dict(error="No such resource"))
+        self._respond(202, result)
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+class FakeServer(ThreadingMixIn, HTTPServer):
+    """
+    Fake FCO server that serves each connection in separate thread.
+    """
+
+    daemon_threads = True
+    # Many concurrent clients connect at once, default backlog of 5 makes
+    # kernel reset some of the connections.
+    request_queue_size = 128
+
+    def __init__(self, inventory=None, latency=0.0, port=0):
+        """
+        Construct fake server that listens on localhost.
+
+        Args:
+            inventory (:obj:`Inventory`): Resources to serve.
+            latency (float): Number of seconds that each request takes.
+            port (int): Port to listen on (default: random free port).
+        """
+        HTTPServer.__init__(self, ("127.0.0.1", port), _Handler)
+        self.inventory = Inventory() if inventory is None else inventory
+        self.latency = latency
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        Address that should be passed to :obj:`Client`.
+        """
+        return "http://{}:{}".format(*self.server_address)
+
+    def start(self):
+        """
+        Start serving requests in background thread.
+        """
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        name="fco-fake-server")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving requests and release the socket.
+        """
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake FCO server")
+    parser.add_argument("-p", "--port", type=int, default=8080,
+                        help="Port to listen on")
+    parser.add_argument("-n", "--inventory", type=int, default=100,
+                        help="Number of generated resources of each type")
+    parser.add_argument("-l", "--latency", type=float, default=0.0,
+                        help="Latency of each request in seconds")
+    parser.add_argument("-d", "--job-duration", type=float, default=1.0,
+                        help="Number of seconds that jobs stay in progress")
+    args = parser.parse_args()
+
+    inventory = Inventory(args.job_duration)
+    for resource_type in DEFAULTS:
+        inventory.populate(resource_type, args.inventory)
+    server = FakeServer(inventory, args.latency, args.port)
+    print("Serving fake FCO at {}".format(server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Import time benchmark.
+
+Each scenario is executed in a fresh interpreter several times and median
+wall clock time is reported, together with an indicator whether requests
+library got imported. Run it with::
+
+    python -m fcoclient.benchmarks.importtime [-r REPEAT] [-o results.json]
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from fcoclient import utils
+
+SCENARIOS = [
+    ("interpreter", "pass"),
+    ("import fcoclient", "import fcoclient"),
+    ("import fcoclient.cli", "import fcoclient.cli"),
+    ("parser (help only)", "from fcoclient import cli; cli.create_parser([])"),
+    ("parser (configure)",
+     "from fcoclient import cli; cli.create_parser(['configure'])"),
+    ("disk skeleton",
+     "from fcoclient import cli, Client; cli.create_parser(['disk']); "
+     "Client('u', 'c', 'p', 'https://localhost').disk.skeleton()"),
+    ("client with requests",
+     "from fcoclient import Client; "
+     "Client('u', 'c', 'p', 'https://localhost').vdc.client.session"),
+]
+
+CHECK = "; import sys; sys.stdout.write(str('requests' in sys.modules))"
+
+
+def run_scenario(code, repeat):
+    """
+    Execute code in fresh interpreters.
+
+    Args:
+        code (str): Python code to execute.
+        repeat (int): Number of executions.
+
+    Returns:
+        Tuple with median time in seconds and flag that tells whether
+        requests library has been imported.
+    """
+    times = []
+    output = None
+    for _ in range(repeat):
+        start = time.time()
+        output = subprocess.check_output([sys.executable, "-c", code + CHECK])
+        times.append(time.time() - start)
+    times.sort()
+    return times[len(times) // 2], output.strip() == b"True"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time benchmark")
+    parser.add_argument("-r", "--repeat", type=int, default=11,
+                        help="Number of runs per scenario")
+    parser.add_argument("-o", "--output", type=argparse.FileType("w"),
+                        help="Store results as JSON into selected file")
+    args = parser.parse_args()
+
+    results = {}
+    for name, code in SCENARIOS:
+        median, loaded = run_scenario(code, args.repeat)
+        results[name] = dict(median_ms=median * 1000, requests=loaded)
+        print("{:<24} {:8.1f} ms  requests imported: {}".format(
+            name, median * 1000, "yes" if loaded else "no"
+        ))
+
+    if args.output is not None:
+        utils.output_json(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
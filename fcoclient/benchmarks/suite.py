@@ -0,0 +1,284 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Client benchmark suite.
+
+Benchmarks run against in-process fake FCO server and measure list
+throughput, ``get`` latency, job waiting overhead, bulk create rate,
+memory used by resources, peak memory of buffered and streamed listing and
+differences between transports. Results can be stored as JSON and compared
+between versions. Run it with::
+
+    python -m fcoclient.benchmarks.suite [-n INVENTORY] [-o results.json]
+"""
+
+from __future__ import print_function
+
+import argparse
+import gc
+import itertools
+import subprocess
+import sys
+import time
+
+from concurrent import futures
+
+from fcoclient import Client, utils
+from fcoclient.exceptions import FCOError
+from fcoclient.benchmarks.fakeserver import FakeServer, Inventory
+from fcoclient.transport import TRANSPORTS
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100.0))]
+
+
+def _latencies(samples):
+    return dict(
+        median_ms=_percentile(samples, 50) * 1000,
+        p95_ms=_percentile(samples, 95) * 1000,
+        max_ms=max(samples) * 1000,
+    )
+
+
+def bench_list(client, page_size):
+    """
+    Measure how fast all servers can be retrieved.
+    """
+    start = time.time()
+    count = sum(1 for _ in client.server.iterate(page_size))
+    elapsed = time.time() - start
+    return dict(items=count, page_size=page_size, seconds=elapsed,
+                items_per_second=count / elapsed)
+
+
+def bench_get(client, uuids):
+    """
+    Measure latency of retrieving single resources by UUID.
+    """
+    samples = []
+    for uuid in uuids:
+        start = time.time()
+        client.server.get(uuid=uuid)
+        samples.append(time.time() - start)
+    return dict(calls=len(samples), **_latencies(samples))
+
+
+def bench_job_wait(client, uuids, job_duration):
+    """
+    Measure how much longer than the job itself waiting for job takes.
+    """
+    samples = []
+    for uuid in uuids:
+        job = client.server.stop(uuid)
+        start = time.time()
+        client.job.wait(job.uuid)
+        samples.append(time.time() - start - job_duration)
+    result = dict(calls=len(samples), job_duration=job_duration,
+                  poll_interval=client.job.poll_interval)
+    result.update(("overhead_" + k, v) for k, v in _latencies(samples).items())
+    return result
+
+
+def bench_bulk_create(client, count, workers):
+    """
+    Measure rate of concurrent disk creation, including waiting for jobs.
+    """
+    skeleton = client.disk.skeleton()
+    start = time.time()
+    with futures.ThreadPoolExecutor(workers) as executor:
+        jobs = list(executor.map(lambda _: client.disk.create(skeleton),
+                                 range(count)))
+    submitted = time.time() - start
+    client.job.wait_all([job.uuid for job in jobs])
+    elapsed = time.time() - start
+    return dict(operations=count, workers=workers,
+                submit_seconds=submitted, seconds=elapsed,
+                operations_per_second=count / elapsed)
+
+
+def bench_memory(client, count):
+    """
+    Measure memory that is occupied by ``count`` listed resources.
+
+    Returns ``None`` on Python versions without :mod:`tracemalloc`.
+    """
+    try:
+        import tracemalloc
+    except ImportError:
+        return None
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        items = list(itertools.islice(client.server.iterate(1000), count))
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return dict(items=len(items), bytes=used,
+                bytes_per_10k=used * 10000.0 / max(len(items), 1))
+
+
+def bench_peak_memory(inventory, page_size):
+    """
+    Measure peak memory while iterating over servers in large pages.
+
+    Items are discarded as soon as they are produced, so the peak is
+    dominated by the handling of a single response. Fake server runs in a
+    separate process in order to keep its allocations out of measurements.
+    Returns ``None`` on Python versions without :mod:`tracemalloc`.
+    """
+    try:
+        import tracemalloc
+    except ImportError:
+        return None
+
+    server = subprocess.Popen(
+        [sys.executable, "-u", "-m", "fcoclient.benchmarks.fakeserver",
+         "-p", "0", "-n", str(inventory)], stdout=subprocess.PIPE,
+    )
+    try:
+        url = server.stdout.readline().decode("utf-8").split()[-1]
+        client = Client("user", "customer", "password", url)
+        result = dict(page_size=page_size)
+        for name, stream in (("buffered", False), ("streamed", True)):
+            gc.collect()
+            tracemalloc.start()
+            try:
+                start = time.time()
+                count = sum(1 for _ in client.server.iterate(page_size,
+                                                             stream))
+                elapsed = time.time() - start
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            result[name] = dict(items=count, peak_bytes=peak,
+                                items_per_second=count / elapsed)
+        client.close()
+    finally:
+        server.terminate()
+        server.wait()
+    return result
+
+
+def bench_transports(url, uuids, page_size):
+    """
+    Compare transports on ``get`` latency and list throughput.
+
+    Transports whose libraries are not installed are reported as ``None``.
+    Fake server only speaks HTTP/1.1, so ``http2`` transport measures the
+    overhead of httpx library here.
+    """
+    results = {}
+    for name in sorted(TRANSPORTS):
+        try:
+            client = Client("user", "customer", "password", url,
+                            transport=name)
+        except FCOError:
+            results[name] = None
+            continue
+        try:
+            client.server.get(uuid=uuids[0])
+            results[name] = dict(
+                get=bench_get(client, uuids),
+                list=bench_list(client, page_size),
+            )
+        finally:
+            client.close()
+    return results
+
+
+def run(inventory=10000, latency=0.0, job_duration=0.2, poll_interval=0.05,
+        page_size=100, calls=200, workers=8):
+    """
+    Execute all benchmarks.
+
+    Args:
+        inventory (int): Number of servers on fake server.
+        latency (float): Number of seconds each request takes.
+        job_duration (float): Number of seconds that jobs stay in progress.
+        poll_interval (float): Number of seconds between job polls.
+        page_size (int): Page size used when listing.
+        calls (int): Number of calls in latency benchmarks and number of
+            operations in bulk benchmark.
+        workers (int): Number of concurrent workers in bulk benchmark.
+
+    Returns:
+        Dictionary with results of all benchmarks.
+    """
+    store = Inventory(job_duration)
+    uuids = store.populate("SERVER", inventory)
+    server = FakeServer(store, latency).start()
+    client = Client("user", "customer", "password", server.url)
+    client.job.poll_interval = poll_interval
+    try:
+        results = dict(
+            python=sys.version.split()[0],
+            parameters=dict(inventory=inventory, latency=latency,
+                            job_duration=job_duration,
+                            poll_interval=poll_interval,
+                            page_size=page_size, calls=calls,
+                            workers=workers),
+            list=bench_list(client, page_size),
+            get=bench_get(client, uuids[:calls]),
+            job_wait=bench_job_wait(client, uuids[:min(calls, 20)],
+                                    job_duration),
+            bulk_create=bench_bulk_create(client, calls, workers),
+            memory=bench_memory(client, min(inventory, 10000)),
+            peak_memory=bench_peak_memory(inventory, min(inventory, 5000)),
+            transports=bench_transports(server.url, uuids[:calls],
+                                        page_size),
+        )
+    finally:
+        client.close()
+        server.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Client benchmark suite")
+    parser.add_argument("-n", "--inventory", type=int, default=10000,
+                        help="Number of servers on fake server")
+    parser.add_argument("-l", "--latency", type=float, default=0.0,
+                        help="Latency of each request in seconds")
+    parser.add_argument("-d", "--job-duration", type=float, default=0.2,
+                        help="Number of seconds that jobs stay in progress")
+    parser.add_argument("-i", "--poll-interval", type=float, default=0.05,
+                        help="Number of seconds between job polls")
+    parser.add_argument("-p", "--page-size", type=int, default=100,
+                        help="Page size used when listing")
+    parser.add_argument("-c", "--calls", type=int, default=200,
+                        help="Number of calls per latency benchmark")
+    parser.add_argument("-j", "--workers", type=int, default=8,
+                        help="Number of workers in bulk benchmark")
+    parser.add_argument("-o", "--output", type=argparse.FileType("w"),
+                        help="Store results as JSON into selected file")
+    args = parser.parse_args()
+
+    results = run(args.inventory, args.latency, args.job_duration,
+                  args.poll_interval, args.page_size, args.calls,
+                  args.workers)
+    utils.output_json(results)
+    print()
+    if args.output is not None:
+        utils.output_json(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module with in-memory cache of recently seen resources.
+"""
+
+import collections
+import copy
+import threading
+import time
+
+
+class ResourceCache(object):
+    """
+    Thread-safe LRU cache of resources with time based expiration.
+
+    Resources are keyed by their type and UUID. Cache stores and returns
+    deep copies of resources, so callers are free to modify them, including
+    nested fields such as server disks. Resources that are in the middle of
+    state change (see :attr:`Resource.settled`) are never stored.
+    """
+
+    def __init__(self, ttl=30, size=1000):
+        """
+        Construct resource cache.
+
+        Args:
+            ttl (float): Number of seconds that cached resource is valid.
+            size (int): Maximum number of resources kept in cache.
+        """
+        self.ttl = ttl
+        self.size = size
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, resource_type, uuid):
+        """
+        Retrieve resource from cache.
+
+        Args:
+            resource_type (:obj:`ResourceType`): Type of the resource.
+            uuid (str): UUID of the resource.
+
+        Returns:
+            Copy of the cached resource or ``None`` if resource is not cached
+            or has expired.
+        """
+        key = (resource_type, uuid)
+        with self._lock:
+            entry = self._items.pop(key, None)
+            if entry is None or entry[0] < time.time():
+                return None
+            self._items[key] = entry
+        return copy.deepcopy(entry[1])
+
+    def put(self, resource):
+        """
+        Store resource in cache.
+
+        Args:
+            resource (:obj:`Resource`): Resource to store.
+        """
+        key = (resource.resource_type, resource.uuid)
+        if not resource.settled:
+            self.discard(*key)
+            return
+        entry = (time.time() + self.ttl, copy.deepcopy(resource))
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = entry
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def discard(self, resource_type, uuid):
+        """
+        Remove resource from cache.
+
+        Args:
+            resource_type (:obj:`ResourceType`): Type of the resource.
+            uuid (str): UUID of the resource.
+        """
+        with self._lock:
+            self._items.pop((resource_type, uuid), None)
+
+    def discard_type(self, resource_type):
+        """
+        Remove all resources of selected type from cache.
+
+        Args:
+            resource_type (:obj:`ResourceType`): Type of the resources.
+        """
+        with self._lock:
+            for key in [k for k in self._items if k[0] == resource_type]:
+                del self._items[key]
+
+    def clear(self):
+        """
+        Remove all resources from cache.
+        """
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
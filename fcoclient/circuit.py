@@ -0,0 +1,191 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module with circuit breaker for FCO API calls.
+
+Breaker tracks outcomes of calls per endpoint (UUIDs in endpoints are
+ignored, so all servers share a single ``resources/server/{uuid}``
+circuit). Connection errors, timeouts and server errors (5xx status codes)
+count as failures. Once an endpoint fails too often, its circuit opens and
+calls to it are rejected immediately with :obj:`CircuitOpenError`. After
+``reset_timeout`` seconds the circuit becomes half-open and lets a single
+probe call through: circuit closes if the probe succeeds and opens again if
+it fails.
+"""
+
+import collections
+import re
+import threading
+import time
+
+from fcoclient.exceptions import CircuitOpenError, FCOError
+
+_UUID_RE = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.I
+)
+
+
+class _Circuit(object):
+
+    def __init__(self, window):
+        self.state = "closed"
+        self.failures = 0
+        self.outcomes = collections.deque(maxlen=window)
+        self.opened = None
+        self.probing = False
+
+
+class CircuitBreaker(object):
+    """
+    Per-endpoint circuit breaker.
+    """
+
+    def __init__(self, failure_threshold=5, error_rate=0.5, window=20,
+                 min_calls=10, reset_timeout=30):
+        """
+        Construct circuit breaker.
+
+        Args:
+            failure_threshold (int): Number of consecutive failures that
+                opens the circuit.
+            error_rate (float): Fraction of failed calls among the last
+                ``window`` calls that opens the circuit.
+            window (int): Number of recent calls used to compute error rate.
+            min_calls (int): Minimum number of recent calls before error rate
+                is taken into account.
+            reset_timeout (float): Number of seconds that circuit stays open
+                before probe call is allowed.
+        """
+        self.failure_threshold = failure_threshold
+        self.error_rate = error_rate
+        self.window = window
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def from_config(config):
+        """
+        Create circuit breaker from configuration.
+
+        Configuration can be ``True`` (use default settings) or a dictionary
+        with constructor arguments as keys.
+
+        Args:
+            config: Circuit breaker configuration or :obj:`CircuitBreaker`.
+
+        Returns:
+            :obj:`CircuitBreaker`: Configured circuit breaker.
+
+        Raises:
+            FCOError: If configuration is not valid.
+        """
+        if isinstance(config, CircuitBreaker):
+            return config
+        if config is True:
+            return CircuitBreaker()
+        try:
+            return CircuitBreaker(**config)
+        except TypeError as e:
+            raise FCOError("Invalid circuit breaker config: {}".format(e))
+
+    @staticmethod
+    def _key(endpoint):
+        return _UUID_RE.sub("{uuid}", endpoint)
+
+    def _circuit(self, key):
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = _Circuit(self.window)
+        return circuit
+
+    def check(self, endpoint):
+        """
+        Make sure that call to endpoint is allowed.
+
+        Args:
+            endpoint (str): Relative resource path.
+
+        Raises:
+            CircuitOpenError: If circuit of the endpoint is open.
+        """
+        key = self._key(endpoint)
+        with self._lock:
+            circuit = self._circuit(key)
+            if circuit.state == "closed":
+                return
+            remaining = circuit.opened + self.reset_timeout - time.time()
+            if remaining <= 0 and not circuit.probing:
+                circuit.state = "half-open"
+                circuit.probing = True
+                return
+        msg = "Circuit for {} is open, retry in {:.1f} s"
+        raise CircuitOpenError(msg.format(key, max(remaining, 0)))
+
+    def record(self, endpoint, success):
+        """
+        Record outcome of the call.
+
+        Args:
+            endpoint (str): Relative resource path.
+            success (bool): True if call succeeded.
+        """
+        with self._lock:
+            circuit = self._circuit(self._key(endpoint))
+            circuit.outcomes.append(success)
+            if success:
+                circuit.failures = 0
+                if circuit.state != "closed":
+                    circuit.state = "closed"
+                    circuit.probing = False
+                    circuit.outcomes.clear()
+                return
+
+            circuit.failures += 1
+            failed = len(circuit.outcomes) - sum(circuit.outcomes)
+            if (circuit.state == "half-open" or
+                    circuit.failures >= self.failure_threshold or
+                    (len(circuit.outcomes) >= self.min_calls and
+                     failed >= self.error_rate * len(circuit.outcomes))):
+                circuit.state = "open"
+                circuit.opened = time.time()
+                circuit.probing = False
+
+    def release(self, endpoint):
+        """
+        Forget about call that ended without telling anything about health
+        of the endpoint (for example, because request could not be built).
+
+        If the call was a half-open probe, next call becomes the probe.
+
+        Args:
+            endpoint (str): Relative resource path.
+        """
+        with self._lock:
+            circuit = self._circuit(self._key(endpoint))
+            circuit.probing = False
+
+    def states(self):
+        """
+        Report state of all known circuits.
+
+        Returns:
+            Dictionary that maps endpoints to ``closed``, ``open`` or
+            ``half-open``.
+        """
+        with self._lock:
+            return {k: c.state for k, c in self._circuits.items()}
@@ -16,39 +16,15 @@
 from __future__ import print_function
 
 import argparse
-import inspect
-import logging
+import os
 import sys
 
-from requests.exceptions import RequestException
-
-from fcoclient import commands
+from fcoclient import commands, log, profiling, tracing, utils
 from fcoclient.client import Client
 from fcoclient.config import Config
 from fcoclient.exceptions import InvalidConfigError, FCOError
 
 
-def _configure_logging():
-    fmt_stream = logging.Formatter("[%(levelname)s] - %(message)s")
-    handler_stream = logging.StreamHandler()
-    handler_stream.setFormatter(fmt_stream)
-    handler_stream.setLevel(logging.INFO)
-
-    fmt_file = logging.Formatter(
-        "%(asctime)s %(name)s:%(lineno)s [%(levelname)s] - %(message)s"
-    )
-    handler_file = logging.FileHandler(".fco.log")
-    handler_file.setFormatter(fmt_file)
-    handler_file.setLevel(logging.DEBUG)
-
-    log = logging.getLogger("fcoclient")
-    log.addHandler(handler_stream)
-    log.addHandler(handler_file)
-    log.setLevel(logging.DEBUG)
-
-    return log
-
-
 class ArgParser(argparse.ArgumentParser):
     """
     Argument parser that displays help on error
@@ -67,26 +43,111 @@ class ArgParser(argparse.ArgumentParser):
         return subparsers
 
 
-def create_parser():
-    parser = ArgParser(description="DICE Deployment Service CLI",
-                       formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+class _PreParser(argparse.ArgumentParser):
+    """
+    Parser that only extracts global options and command name
+    """
+
+    def error(self, message):
+        raise ValueError(message)
+
+
+def _add_global_arguments(parser):
     parser.add_argument("--config", help="Configuration file to use",
                         default=".fco.conf")
+    parser.add_argument("--agent-socket", help="Socket of the local agent",
+                        default=os.environ.get("FCO_AGENT_SOCKET",
+                                               ".fco.sock"))
+    parser.add_argument("--no-agent", action="store_true",
+                        help="Do not forward commands to local agent")
+    parser.add_argument("--log-level", choices=log.LEVELS, default="DEBUG",
+                        help="Minimal level of logged messages")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print timing breakdown of API calls at exit")
+    parser.add_argument("--profile-output", metavar="FILE",
+                        help="Store cProfile statistics into selected file")
+    parser.add_argument("--metrics-output", metavar="FILE",
+                        help="Store metrics of API calls into selected file "
+                        "(Prometheus text format if name ends with .prom, "
+                        "JSON otherwise)")
+    parser.add_argument("--record", metavar="FILE",
+                        help="Record API traffic into selected file")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="Serve API calls from recorded traffic")
+    parser.add_argument("--replay-latency-scale", type=float, default=1.0,
+                        metavar="FACTOR",
+                        help="Factor that recorded latencies are multiplied "
+                        "by when replaying")
+    parser.add_argument("--trace", metavar="DEST",
+                        help="Trace operations and print spans to console "
+                        "(console), hand them to OpenTelemetry (otel) or "
+                        "append them to selected file")
+
+
+def select_command(argv):
+    """
+    Find name of the command that is selected in ``argv``.
+
+    Args:
+        argv: Command line arguments (without program name).
+
+    Returns:
+        Command name or ``None`` if no command is selected.
+    """
+    parser = _PreParser(add_help=False)
+    _add_global_arguments(parser)
+    parser.add_argument("command", nargs="?")
+    try:
+        args, _ = parser.parse_known_args(argv)
+    except ValueError:
+        return None
+    return args.command
+
+
+def create_parser(argv=None):
+    """
+    Create command line parser.
+
+    Only the command that is selected in ``argv`` is fully loaded. Other
+    commands are represented by placeholders that are only good for
+    displaying help.
+
+    Args:
+        argv: Arguments that will be parsed (default: ``sys.argv[1:]``).
+    """
+    parser = ArgParser(description="DICE Deployment Service CLI",
+                       formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    _add_global_arguments(parser)
     subparsers = parser.add_subparsers()
 
-    cmds = inspect.getmembers(commands, inspect.isclass)
-    for _, cls in sorted(cmds, key=lambda x: x[0]):
-        sub = cls.add_subparser(subparsers)
-        sub.set_defaults(cls=cls)
+    selected = select_command(sys.argv[1:] if argv is None else argv)
+    for info in commands.COMMANDS:
+        if info.name == selected:
+            cls = commands.load(info)
+            sub = cls.add_subparser(subparsers)
+            sub.set_defaults(cls=cls)
+        else:
+            subparsers.add_parser(info.name, help=info.help)
 
     return parser
 
 
 def main():
-    logger = _configure_logging()
+    argv = sys.argv[1:]
+    parser = create_parser(argv)
+    args = parser.parse_args(argv)
 
-    parser = create_parser()
-    args = parser.parse_args()
+    logger = log.configure(args.log_level)
+    profile = args.profile or args.profile_output is not None
+    local = (profile or args.metrics_output is not None or
+             args.trace is not None or args.record is not None or
+             args.replay is not None)
+
+    if (args.cls.forwardable and not args.no_agent and not local and
+            os.path.exists(args.agent_socket)):
+        code = _forward(argv, args, logger)
+        if code is not None:
+            return code
 
     client = None
     if args.cls.require_client:
@@ -96,9 +157,133 @@ def main():
             print("ERROR: {}".format(e), file=sys.stderr)
             return 1
 
+    registry = None
+    try:
+        if client is not None:
+            registry = _instrument(args, client)
+        if args.trace is not None:
+            tracing.set_tracer(_create_tracer(args.trace))
+    except FCOError as e:
+        logger.error(e)
+        return 1
+
+    try:
+        if not profile:
+            return execute(args, client, logger)
+        return _profile(args, client, logger)
+    finally:
+        if registry is not None:
+            _store_metrics(registry, args.metrics_output)
+        tracing.tracer.close()
+        tracing.set_tracer(None)
+        if client is not None:
+            client.close()
+
+
+def _instrument(args, client):
+    """
+    Apply global options that change how client talks to FCO.
+
+    Returns:
+        :obj:`MetricsRegistry` if metrics are collected, ``None`` otherwise.
+    """
+    if args.replay is not None:
+        client.replay(args.replay, args.replay_latency_scale)
+    if args.record is not None:
+        client.record(args.record)
+    if args.metrics_output is not None:
+        return client.enable_metrics()
+    return None
+
+
+def _create_tracer(dest):
+    if dest == "console":
+        return tracing.Tracer(tracing.ConsoleExporter())
+    if dest == "otel":
+        return tracing.OpenTelemetryTracer()
+    return tracing.Tracer(tracing.FileExporter(dest))
+
+
+def _store_metrics(registry, path):
+    with open(path, "w") as f:
+        if path.endswith(".prom"):
+            f.write(registry.prometheus())
+        else:
+            utils.output_json(registry.as_dict(), f)
+
+
+def _profile(args, client, logger):
+    """
+    Execute command with profiler installed.
+    """
+    profiler = profiling.install()
+    cprofile = None
+    if args.profile_output is not None:
+        import cProfile
+
+        cprofile = cProfile.Profile()
+        cprofile.enable()
+
+    try:
+        return execute(args, client, logger)
+    finally:
+        if cprofile is not None:
+            cprofile.disable()
+            cprofile.dump_stats(args.profile_output)
+        profiling.uninstall()
+        if args.profile:
+            profiler.summary(sys.stderr)
+
+
+def _forward(argv, args, logger):
+    """
+    Try to execute command in local agent.
+
+    Files that were given on command line are passed to agent as absolute
+    paths. Commands that read from standard input are never forwarded.
+    """
+    from fcoclient import agent
+
+    files = [v for v in vars(args).values()
+             if hasattr(v, "close") and v is not sys.stdout]
+    if sys.stdin in files:
+        return None
+    names = set(f.name for f in files)
+    argv = [os.path.abspath(a) if a in names else a for a in argv]
+
+    try:
+        response = agent.forward(args.agent_socket, argv, args.config)
+    except FCOError as e:
+        logger.error(e)
+        return 1
+    if response is None:
+        return None
+
+    for f in files:
+        f.close()
+
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["code"]
+
+
+def execute(args, client, logger, out=None):
+    """
+    Execute command that was selected when parsing arguments.
+
+    Args:
+        args: Parsed command line arguments.
+        client (:obj:`Client`): Client that command should use.
+        logger: Logger that command should use.
+        out: File like object that receives command output (default:
+            standard output).
+
+    Returns:
+        Exit code of the command.
+    """
     try:
-        getattr(args.cls(client, logger), args.command)(args)
-    except (FCOError, RequestException) as e:
+        getattr(args.cls(client, logger, out), args.command)(args)
+    except FCOError as e:
         logger.error(e)
         return 1
 
@@ -17,20 +17,26 @@
 Module with http and wrapper clients for FCO.
 """
 
-import requests
+import logging
+import threading
+import time
 
-from fcoclient import exceptions
+from fcoclient import exceptions, jsonstream, profiling, tracing
+from fcoclient.cache import ResourceCache
+from fcoclient.circuit import CircuitBreaker
+from fcoclient.coalesce import Coalescing
+from fcoclient.hedging import HedgingPolicy
+from fcoclient.metrics import MetricsRegistry
+from fcoclient.ratelimit import RateLimiter
+from fcoclient.transport import (
+    DEFAULT_TIMEOUT, RecordingTransport, ReplayTransport, Transport,
+    create_transport
+)
 
-from fcoclient.resources.disk import DiskClient
-from fcoclient.resources.firewalltemplate import FirewallTemplateClient
-from fcoclient.resources.image import ImageClient
-from fcoclient.resources.job import JobClient
-from fcoclient.resources.nic import NicClient
-from fcoclient.resources.network import NetworkClient
-from fcoclient.resources.productoffer import ProductOfferClient
-from fcoclient.resources.server import ServerClient
-from fcoclient.resources.sshkey import SshKeyClient
-from fcoclient.resources.vdc import VdcClient
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_SIZE = 64 * 1024
+"""Number of bytes read at once from streamed responses."""
 
 
 class APIClient(object):
@@ -43,9 +49,33 @@ class APIClient(object):
     Note that this client should not be used directly, use Client in this
     package that provides higher level abstraction over available
     functionality.
+
+    Client is safe to use from multiple threads. Requests are delivered by
+    a :obj:`Transport`. Default transport gives each thread its own http
+    session (and with it its own connection pool), which means that
+    requests do not need to acquire any locks. Requests library is only
+    imported when the first session is created, so programs that never talk
+    to FCO do not pay for importing it.
+
+    Code that needs to observe API calls can register hooks using
+    :meth:`add_hook`. Hooks are called in the thread that makes the call:
+
+      * ``before(method, endpoint, data)`` before request is sent,
+      * ``after(method, endpoint, response, duration)`` when response
+        arrives, regardless of its status,
+      * ``error(method, endpoint, error, duration)`` when call raises
+        :obj:`FCOError`.
+
+    Body of response with ``streamed`` attribute set has not been read yet
+    when ``after`` hooks run and must not be accessed by them. Errors that
+    occur while streamed body is read have ``response`` attribute set.
     """
 
-    def __init__(self, username, customer, password, url, verify):
+    hook_events = ("before", "after", "error")
+
+    def __init__(self, username, customer, password, url, verify,
+                 rate_limiter=None, transport=None, timeout=DEFAULT_TIMEOUT,
+                 circuit_breaker=None):
         """
         Initialize http client.
 
@@ -58,19 +88,191 @@ class APIClient(object):
                 disable validation, ``True`` to validate certificates against
                 system trusted certificates or path to certificate file to
                 validate against custom server certificate (even self-signed).
+            rate_limiter (:obj:`RateLimiter`): Optional rate limiter that
+                all requests pass through.
+            transport: :obj:`Transport` that delivers requests or name of
+                the transport that should be created (see
+                :data:`fcoclient.transport.TRANSPORTS`). If ``None``,
+                :obj:`RequestsTransport` is used.
+            timeout: Connect and read timeouts of created transport.
+            circuit_breaker (:obj:`CircuitBreaker`): Optional circuit breaker
+                that rejects calls to failing endpoints.
         """
         self.auth = ("{}/{}".format(username, customer), password)
         url = url if url[-1] == "/" else (url + "/")
         self.url = url + "rest/user/5.0/"
         self.verify = verify
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.cache = None
+        self.coalescing = None
+        self.hedging = None
+        self.hooks = {event: () for event in self.hook_events}
+        self._hooks_lock = threading.Lock()
+        if transport is None:
+            transport = "requests"
+        if not isinstance(transport, Transport):
+            transport = create_transport(transport, self.auth, verify,
+                                         timeout)
+        self.transport = transport
+
+    @property
+    def session(self):
+        """
+        Http session that belongs to the calling thread.
+
+        Only available when requests are delivered by
+        :obj:`RequestsTransport`.
+        """
+        return self.transport.session
+
+    def close(self):
+        """
+        Release resources held by transport.
+
+        Client can still be used after it has been closed, new connections
+        are created on demand.
+        """
+        self.transport.close()
+
+    def add_hook(self, event, hook):
+        """
+        Register hook.
+
+        Args:
+            event (str): One of the ``hook_events``.
+            hook: Callable to register.
+        """
+        with self._hooks_lock:
+            self.hooks[event] = self.hooks[event] + (hook,)
 
-    def _query(self, method, endpoint, data, status_code):
-        url = self.url + endpoint
-        response = method(url, auth=self.auth, json=data, verify=self.verify,
-                          headers={"Content-Type": "application/json"})
-        if response.status_code != status_code:
-            raise exceptions.APICallError(response)
-        return response.json()
+    def remove_hook(self, event, hook):
+        """
+        Unregister hook.
+
+        Args:
+            event (str): One of the ``hook_events``.
+            hook: Previously registered callable.
+        """
+        with self._hooks_lock:
+            hooks = list(self.hooks[event])
+            hooks.remove(hook)
+            self.hooks[event] = tuple(hooks)
+
+    def _query(self, method, endpoint, data, status_code, key=None):
+        if not tracing.tracer.enabled:
+            return self._call(method, endpoint, data, status_code, None, key)
+        with tracing.span("http." + method, endpoint=endpoint) as span:
+            return self._call(method, endpoint, data, status_code, span, key)
+
+    def _call(self, method, endpoint, data, status_code, span, key):
+        # Hooks are stored in tuples that are replaced on change, which means
+        # that calls need no locking and cost almost nothing without hooks.
+        hooks = self.hooks
+        for hook in hooks["before"]:
+            hook(method, endpoint, data)
+        start = time.time()
+        try:
+            response = self._query_response(method, endpoint, data, start,
+                                            key is not None)
+            response.streamed = key is not None
+            duration = time.time() - start
+            if span is not None:
+                span.set_attribute("status", response.status_code)
+            for hook in hooks["after"]:
+                hook(method, endpoint, response, duration)
+            if response.status_code != status_code:
+                raise exceptions.APICallError(response)
+            if key is not None:
+                return self._iter_items(method, endpoint, start, response,
+                                        key)
+            return self._decode(response)
+        except exceptions.FCOError as e:
+            duration = time.time() - start
+            for hook in hooks["error"]:
+                hook(method, endpoint, e, duration)
+            raise
+
+    def _query_response(self, method, endpoint, data, start, stream):
+        breaker = self.circuit_breaker
+        if breaker is not None:
+            breaker.check(endpoint)
+        profiler = profiling.profiler
+        try:
+            if self.rate_limiter is None:
+                response = self._send(method, endpoint, data, profiler,
+                                      stream)
+            else:
+                with self.rate_limiter.limit(method, endpoint):
+                    if profiler is not None:
+                        profiler.add("throttle", time.time() - start)
+                    response = self._send(method, endpoint, data,
+                                          profiler, stream)
+        except exceptions.APIConnectionError:
+            if breaker is not None:
+                breaker.record(endpoint, False)
+            raise
+        except BaseException:
+            # Probe that half-opened the circuit must always be resolved,
+            # otherwise circuit would stay half-open forever.
+            if breaker is not None:
+                breaker.release(endpoint)
+            raise
+        if breaker is not None:
+            breaker.record(endpoint, response.status_code < 500)
+        if logger.isEnabledFor(logging.DEBUG):
+            duration = time.time() - start
+            logger.debug("{} {} -> {} ({:.1f} ms)".format(
+                method, endpoint, response.status_code, duration * 1000
+            ), extra=dict(method=method, endpoint=endpoint,
+                          status=response.status_code,
+                          duration_ms=round(duration * 1000, 3)))
+        return response
+
+    def _send(self, method, endpoint, data, profiler, stream):
+        # Hedging needs to own both responses, which does not mix with
+        # responses that are consumed after the call returns.
+        hedging = self.hedging
+        if (hedging is None or stream or
+                not hedging.applies(method, endpoint)):
+            return self.transport.send(method, self.url + endpoint, data,
+                                       profiler, stream)
+        return hedging.send(self.transport, method, endpoint,
+                            self.url + endpoint, data, profiler,
+                            self.rate_limiter)
+
+    @staticmethod
+    def _decode(response):
+        profiler = profiling.profiler
+        if profiler is None:
+            return response.json()
+
+        start = time.time()
+        result = response.json()
+        profiler.add("decode", time.time() - start)
+        return result
+
+    def _iter_items(self, method, endpoint, start, response, key):
+        chunks = response.iter_content(STREAM_CHUNK_SIZE)
+        try:
+            for item in jsonstream.iter_array(chunks, key):
+                yield item
+        except (IOError, ValueError) as e:
+            # Errors of requests library that occur while body is being read
+            # are subclasses of IOError. Body that ends early (connection
+            # dropped without an error) or is not valid JSON fails to decode.
+            error = exceptions.APIConnectionError(
+                "Reading response body failed: {}".format(e)
+            )
+            error.response = response
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record(endpoint, False)
+            duration = time.time() - start
+            for hook in self.hooks["error"]:
+                hook(method, endpoint, error, duration)
+            raise error
+        finally:
+            response.close()
 
     def get(self, endpoint, status_code):
         """
@@ -86,7 +288,7 @@ class APIClient(object):
         Raises:
             APICallError: If ``status_code`` does not match response's status.
         """
-        return self._query(requests.get, endpoint, None, status_code)
+        return self._query("GET", endpoint, None, status_code)
 
     def post(self, endpoint, data, status_code):
         """
@@ -102,7 +304,29 @@ class APIClient(object):
         Raises:
             APICallError: If ``status_code`` does not match response's status.
         """
-        return self._query(requests.post, endpoint, data, status_code)
+        return self._query("POST", endpoint, data, status_code)
+
+    def post_stream(self, endpoint, data, status_code, key):
+        """
+        Send POST request to FCO API and decode response incrementally.
+
+        Response body is read in chunks and elements of the array that is
+        stored under ``key`` are yielded as soon as they are decoded, which
+        keeps memory usage independent of the response size.
+
+        Args:
+            endpoint (str): Relative resource path.
+            data: JSON serializable payload.
+            status_code (int): Expected status code
+            key (str): Name of the top-level field that holds the array.
+
+        Returns:
+            Generator of dictionaries representing array elements.
+
+        Raises:
+            APICallError: If ``status_code`` does not match response's status.
+        """
+        return self._query("POST", endpoint, data, status_code, key)
 
     def put(self, endpoint, data, status_code):
         """
@@ -118,7 +342,7 @@ class APIClient(object):
         Raises:
             APICallError: If ``status_code`` does not match response's status.
         """
-        return self._query(requests.put, endpoint, data, status_code)
+        return self._query("PUT", endpoint, data, status_code)
 
     def delete(self, endpoint, data, status_code):
         """
@@ -134,15 +358,62 @@ class APIClient(object):
         Raises:
             APICallError: If ``status_code`` does not match response's status.
         """
-        return self._query(requests.delete, endpoint, data, status_code)
+        return self._query("DELETE", endpoint, data, status_code)
+
+
+class _ResourceClient(object):
+    """
+    Descriptor that imports and constructs resource client on first access.
+
+    Constructed client is stored in instance dictionary, which means that
+    descriptor is only consulted once per client instance.
+    """
+
+    def __init__(self, name):
+        """
+        Construct resource client descriptor.
+
+        Args:
+            name (str): Name of the attribute and of the
+                :obj:`ResourceType` whose client it holds.
+        """
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        from fcoclient.resources.base import ResourceType, client_for
+
+        client = client_for(ResourceType[self.name], instance._client)
+        return instance.__dict__.setdefault(self.name, client)
 
 
 class Client(object):
     """
     Main interface to the FCO REST API.
+
+    Single client instance can be shared between multiple threads. Resource
+    clients are stateless and all transports are thread-safe, so no
+    additional synchronization is needed.
+
+    Resource clients (and modules that implement them) are loaded on first
+    access.
     """
 
-    def __init__(self, username, customer, password, url, verify=True):
+    disk = _ResourceClient("disk")
+    firewalltemplate = _ResourceClient("firewalltemplate")
+    image = _ResourceClient("image")
+    job = _ResourceClient("job")
+    nic = _ResourceClient("nic")
+    network = _ResourceClient("network")
+    productoffer = _ResourceClient("productoffer")
+    server = _ResourceClient("server")
+    sshkey = _ResourceClient("sshkey")
+    vdc = _ResourceClient("vdc")
+
+    def __init__(self, username, customer, password, url, verify=True,
+                 rate_limit=None, timeout=DEFAULT_TIMEOUT,
+                 circuit_breaker=None, transport=None):
         """
         Construct main FCO client.
 
@@ -155,16 +426,131 @@ class Client(object):
                 disable validation, ``True`` to validate certificates against
                 system trusted certificates or path to certificate file to
                 validate against custom server certificate (even self-signed).
+            rate_limit: Rate limiter configuration. Can be a number of
+                requests per second, a dictionary accepted by
+                :meth:`RateLimiter.from_config` or a :obj:`RateLimiter`
+                instance that is shared between multiple clients.
+            timeout: Number of seconds or a pair of connect and read
+                timeouts in seconds that applies to every request.
+            circuit_breaker: Circuit breaker configuration. Can be ``True``
+                (use defaults), a dictionary accepted by
+                :meth:`CircuitBreaker.from_config` or a
+                :obj:`CircuitBreaker` instance.
+            transport: Name of the transport (``requests``, ``urllib3`` or
+                ``http2``) or a :obj:`Transport` instance.
+        """
+        rate_limiter = None
+        if rate_limit is not None:
+            rate_limiter = RateLimiter.from_config(rate_limit)
+        breaker = None
+        if circuit_breaker:
+            breaker = CircuitBreaker.from_config(circuit_breaker)
+        if isinstance(timeout, list):
+            timeout = tuple(timeout)
+        self._client = APIClient(username, customer, password, url, verify,
+                                 rate_limiter=rate_limiter, timeout=timeout,
+                                 circuit_breaker=breaker, transport=transport)
+
+    def enable_cache(self, ttl=30, size=1000):
+        """
+        Cache resources that client has seen recently.
+
+        When cache is enabled, ``get`` calls that select resource by UUID
+        only are served from cache if resource has been retrieved in the last
+        ``ttl`` seconds. Jobs and resources in the middle of state change are
+        never cached, and resources are removed from cache when job that
+        changes them is observed to terminate.
+
+        Args:
+            ttl (float): Number of seconds that cached resource is valid.
+            size (int): Maximum number of cached resources.
+        """
+        self._client.cache = ResourceCache(ttl, size)
+
+    def enable_coalescing(self, window=0.005, max_batch=100):
+        """
+        Merge concurrent ``get`` calls into a single list request.
+
+        When coalescing is enabled, ``get`` calls that select resource by
+        UUID only and arrive within ``window`` seconds of each other are
+        served by a single list request that filters by all of the UUIDs.
+        Calls for resource that is already being retrieved share the
+        response of the request that is in flight.
+
+        Args:
+            window (float): Number of seconds that the first call waits for
+                other calls.
+            max_batch (int): Maximum number of UUIDs in single request.
+        """
+        self._client.coalescing = Coalescing(window, max_batch)
+
+    def enable_hedging(self, percentile=95, delay=None, budget=0.05):
+        """
+        Hedge slow read requests.
+
+        When hedging is enabled, read request that takes longer than the
+        selected percentile of recent reads is sent again and the response
+        that arrives first is used. Requests that change resources are never
+        hedged.
+
+        Args:
+            percentile (float): Latency percentile that is used as hedging
+                delay.
+            delay (float): Fixed hedging delay in seconds. Overrides
+                ``percentile`` if set.
+            budget (float): Fraction of reads that can be hedged.
+
+        Returns:
+            :obj:`HedgingPolicy`: Policy with hedging statistics.
+        """
+        self._client.hedging = HedgingPolicy(percentile, delay, budget)
+        return self._client.hedging
+
+    def enable_metrics(self, registry=None):
+        """
+        Collect metrics of API calls.
+
+        Args:
+            registry (:obj:`MetricsRegistry`): Registry that should receive
+                metrics. Pass the same registry to multiple clients in order
+                to aggregate their metrics. New registry is created if this
+                is ``None``.
+
+        Returns:
+            :obj:`MetricsRegistry`: Registry that collects metrics.
+        """
+        if registry is None:
+            registry = MetricsRegistry()
+        registry.attach(self._client)
+        return registry
+
+    def record(self, path):
+        """
+        Record API traffic into a file.
+
+        Recording can be replayed later using :meth:`replay`.
+
+        Args:
+            path (str): File that traffic is appended to. File is gzip
+                compressed if its name ends with ``.gz``.
+        """
+        transport = self._client.transport
+        self._client.transport = RecordingTransport(transport, path)
+
+    def replay(self, path, latency_scale=1.0):
+        """
+        Serve API calls from recording instead of contacting FCO.
+
+        Args:
+            path (str): File with recorded traffic.
+            latency_scale (float): Factor that recorded latencies are
+                multiplied by. Use 0 to respond immediately.
+        """
+        self._client.transport.close()
+        self._client.transport = ReplayTransport(path, latency_scale)
+
+    def close(self):
+        """
+        Release network connections held by the client.
         """
-        client = APIClient(username, customer, password, url, verify)
-
-        self.disk = DiskClient(client)
-        self.firewalltemplate = FirewallTemplateClient(client)
-        self.image = ImageClient(client)
-        self.job = JobClient(client)
-        self.nic = NicClient(client)
-        self.network = NetworkClient(client)
-        self.productoffer = ProductOfferClient(client)
-        self.server = ServerClient(client)
-        self.sshkey = SshKeyClient(client)
-        self.vdc = VdcClient(client)
+        self._client.close()
@@ -0,0 +1,161 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module with coalescing of concurrent get-by-UUID calls.
+
+When many threads retrieve resources by UUID at roughly the same time, the
+first call waits for a short window, collects all UUIDs requested in the
+meantime and retrieves them using single filtered list request. Calls for
+UUID that is already being retrieved share the result of the request that
+is in flight.
+"""
+
+import collections
+import copy
+import threading
+import time
+
+from concurrent import futures
+
+from fcoclient import exceptions
+
+
+class GetCoalescer(object):
+    """
+    Coalesces get-by-UUID calls of a single resource client.
+    """
+
+    def __init__(self, resource_client, window=0.005, max_batch=100):
+        """
+        Construct coalescer.
+
+        Args:
+            resource_client (:obj:`BaseClient`): Client that retrieves
+                resources.
+            window (float): Number of seconds that the first call in batch
+                waits for other calls.
+            max_batch (int): Maximal number of UUIDs in single request.
+                Batch is sent immediately once it is full.
+        """
+        self.resource_client = resource_client
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = collections.OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get(self, uuid):
+        """
+        Retrieve resource.
+
+        Args:
+            uuid (str): UUID of the resource.
+
+        Returns:
+            Deep copy of the retrieved resource, callers that share the
+            request are free to modify nested fields.
+
+        Raises:
+            NoSuchResourceError: If resource does not exist.
+        """
+        with self._lock:
+            future = self._pending.get(uuid) or self._inflight.get(uuid)
+            leader = full = False
+            if future is None:
+                future = futures.Future()
+                self._pending[uuid] = future
+                leader = len(self._pending) == 1
+                full = len(self._pending) >= self.max_batch
+
+        if full:
+            self._dispatch()
+        elif leader:
+            # Batch must be sent even if leader is interrupted, otherwise
+            # other callers would wait for it forever.
+            try:
+                time.sleep(self.window)
+            finally:
+                self._dispatch()
+        return copy.deepcopy(future.result())
+
+    def _dispatch(self):
+        with self._lock:
+            batch, self._pending = self._pending, collections.OrderedDict()
+            self._inflight.update(batch)
+        if len(batch) == 0:
+            return
+
+        try:
+            uuids = list(batch)
+            items = self.resource_client.list(len(uuids), uuid=uuids)
+        except BaseException as e:
+            for future in batch.values():
+                future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            found = {item.uuid: item for item in items}
+            for uuid, future in batch.items():
+                if uuid in found:
+                    future.set_result(found[uuid])
+                else:
+                    error = exceptions.NoSuchResourceError(dict(uuid=uuid))
+                    future.set_exception(error)
+        finally:
+            with self._lock:
+                for uuid in batch:
+                    self._inflight.pop(uuid, None)
+
+
+class Coalescing(object):
+    """
+    Coalescing configuration that creates coalescers on demand.
+    """
+
+    def __init__(self, window=0.005, max_batch=100):
+        """
+        Construct coalescing configuration.
+
+        Args:
+            window (float): Number of seconds that the first call in batch
+                waits for other calls.
+            max_batch (int): Maximal number of UUIDs in single request.
+        """
+        self.window = window
+        self.max_batch = max_batch
+        self._coalescers = {}
+        self._lock = threading.Lock()
+
+    def get(self, resource_client, uuid):
+        """
+        Retrieve resource using coalescer of selected resource client.
+
+        Args:
+            resource_client (:obj:`BaseClient`): Client that retrieves
+                resources.
+            uuid (str): UUID of the resource.
+
+        Returns:
+            Copy of the retrieved resource.
+        """
+        key = resource_client.endpoint
+        with self._lock:
+            coalescer = self._coalescers.get(key)
+            if coalescer is None:
+                coalescer = GetCoalescer(resource_client, self.window,
+                                         self.max_batch)
+                self._coalescers[key] = coalescer
+        return coalescer.get(uuid)
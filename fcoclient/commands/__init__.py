@@ -13,28 +13,48 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from fcoclient.commands.configure import ConfigureCmd
-from fcoclient.commands.disk import DiskCmd
-from fcoclient.commands.firewalltemplate import FirewallTemplateCmd
-from fcoclient.commands.image import ImageCmd
-from fcoclient.commands.job import JobCmd
-from fcoclient.commands.nic import NicCmd
-from fcoclient.commands.network import NetworkCmd
-from fcoclient.commands.productoffer import ProductOfferCmd
-from fcoclient.commands.server import ServerCmd
-from fcoclient.commands.sshkey import SshKeyCmd
-from fcoclient.commands.vdc import VdcCmd
-
-__all__ = [
-    "ConfigureCmd",
-    "DiskCmd",
-    "FirewallTemplateCmd",
-    "ImageCmd",
-    "JobCmd",
-    "NicCmd",
-    "NetworkCmd",
-    "ProductOfferCmd",
-    "ServerCmd",
-    "SshKeyCmd",
-    "VdcCmd",
+"""
+Registry of command line commands.
+
+Command modules are only imported when the command is actually used, which
+keeps start-up time of the command line client low.
+"""
+
+import collections
+import importlib
+
+CommandInfo = collections.namedtuple("CommandInfo", "name help module klass")
+
+COMMANDS = [
+    CommandInfo("agent", "Run local agent", "agent", "AgentCmd"),
+    CommandInfo("batch", "Execute batch of operations", "batch", "BatchCmd"),
+    CommandInfo("bench", "Generate load on FCO", "bench", "BenchCmd"),
+    CommandInfo("configure", "Configure client", "configure", "ConfigureCmd"),
+    CommandInfo("disk", "Manage disks", "disk", "DiskCmd"),
+    CommandInfo("firewalltemplate", "Inspect firewall templates",
+                "firewalltemplate", "FirewallTemplateCmd"),
+    CommandInfo("image", "Inspect images", "image", "ImageCmd"),
+    CommandInfo("job", "Inspect jobs", "job", "JobCmd"),
+    CommandInfo("network", "Inspect networks", "network", "NetworkCmd"),
+    CommandInfo("nic", "Inspect network interfaces", "nic", "NicCmd"),
+    CommandInfo("offer", "Inspect product offers", "productoffer",
+                "ProductOfferCmd"),
+    CommandInfo("server", "Manage servers", "server", "ServerCmd"),
+    CommandInfo("shell", "Run commands interactively", "shell", "ShellCmd"),
+    CommandInfo("sshkey", "Manage ssh keys", "sshkey", "SshKeyCmd"),
+    CommandInfo("vdc", "Inspect virtual data centers", "vdc", "VdcCmd"),
 ]
+
+
+def load(info):
+    """
+    Import command class.
+
+    Args:
+        info (:obj:`CommandInfo`): Registry entry of the command.
+
+    Returns:
+        Command class.
+    """
+    module = importlib.import_module("fcoclient.commands." + info.module)
+    return getattr(module, info.klass)
@@ -0,0 +1,50 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from fcoclient.agent import AgentServer
+from fcoclient.commands.base import Command
+from fcoclient.resources.job import JobPoller
+
+
+class AgentCmd(Command):
+
+    forwardable = False
+
+    @staticmethod
+    def add_subparser(subparsers):
+        parser = subparsers.add_parser("agent", help="Run local agent")
+        parser.add_argument("--poll-interval", type=float, default=5,
+                            help="Number of seconds between job polls")
+        parser.add_argument("--cache-ttl", type=float, default=30,
+                            help="Number of seconds that resources are "
+                            "cached (0 disables cache)")
+        return parser
+
+    def agent(self, args):
+        if args.cache_ttl > 0:
+            self.client.enable_cache(args.cache_ttl)
+        self.client.job.poller = JobPoller(self.client.job,
+                                           args.poll_interval)
+
+        server = AgentServer(args.agent_socket, self.client, args.config,
+                             self.logger)
+        self.logger.info("Agent listening on {}".format(args.agent_socket))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        self.logger.info("Agent terminated")
@@ -23,12 +23,15 @@ import argparse
 import sys
 
 from fcoclient import utils
+from fcoclient.commands import output
 from fcoclient.exceptions import FCOError
+from fcoclient.teardown import TeardownPlanner
 
 
 class Command(object):
 
     require_client = True
+    forwardable = True
 
     @staticmethod
     def add_subparser(subparsers):
@@ -44,6 +47,11 @@ class Command(object):
             "-f", "--filter", action="append",
             help="Only display {} matching filter".format(item_names)
         )
+        parser.add_argument("-o", "--output", choices=output.FORMATS,
+                            default="text", help="Output format")
+        parser.add_argument("-p", "--page-size", type=int, default=100,
+                            help="Number of {} to retrieve in single "
+                            "request".format(item_names))
         return parser
 
     @staticmethod
@@ -51,6 +59,9 @@ class Command(object):
         msg = "Get details about selected {}".format(item_name)
         parser = subparsers.add_parser("get", help=msg)
         parser.add_argument("uuid", help="UUID of the {}".format(item_name))
+        parser.add_argument("-o", "--output", default="json",
+                            choices=("json", "ndjson", "csv"),
+                            help="Output format")
         return parser
 
     @staticmethod
@@ -84,9 +95,22 @@ class Command(object):
                             help="Delete dependent resources")
         return parser
 
-    def __init__(self, client, logger):
+    @staticmethod
+    def create_teardown_parser(subparsers, item_name):
+        msg = "Delete {} together with dependent resources".format(item_name)
+        parser = subparsers.add_parser("teardown", help=msg)
+        parser.add_argument("uuid", help="UUID of the {}".format(item_name))
+        parser.add_argument("-j", "--jobs", type=int, default=8,
+                            help="Number of parallel delete requests")
+        parser.add_argument("-d", "--dry-run", action="store_true",
+                            help="Only display resources that would be "
+                            "deleted")
+        return parser
+
+    def __init__(self, client, logger, out=None):
         self.client = client
         self.logger = logger
+        self.out = sys.stdout if out is None else out
 
     def parse_filter(self, filter_conditions):
         if filter_conditions is None:
@@ -96,28 +120,60 @@ class Command(object):
         except ValueError:
             raise FCOError("Malformed filter. Must be in key=value form.")
 
+    @staticmethod
+    def format_item(item):
+        return "{} ({})".format(item.name, item.uuid)
+
+    def output_items(self, args, conditions):
+        writer = output.create_writer(args.output, self.out,
+                                      self.format_item)
+        for page in self.resource_client.pages(args.page_size, args.no_items,
+                                               **conditions):
+            writer.write(page)
+        writer.close()
+
     def list(self, args):
         self.logger.info("Listing items")
         conditions = self.parse_filter(args.filter)
-        for item in self.resource_client.list(args.no_items, **conditions):
-            print("{} ({})".format(item.name, item.uuid))
+        self.output_items(args, conditions)
         self.logger.info("Items listed")
 
     def get(self, args):
         self.logger.info("Getting item details")
-        utils.output_json(self.resource_client.get(uuid=args.uuid))
+        if args.output == "json":
+            writer = output.PrettyJsonWriter(self.out)
+        else:
+            writer = output.create_writer(args.output, self.out)
+        writer.write([self.resource_client.get(uuid=args.uuid)])
+        writer.close()
         self.logger.info("Item details retrieved")
 
     def skeleton(self, _):
         self.logger.info("Generating item skeleton")
-        utils.output_json(self.resource_client.skeleton())
+        utils.output_json(self.resource_client.skeleton(), self.out)
         self.logger.info("Done generating item skeleton")
 
+    def teardown(self, args):
+        self.logger.info("Planning teardown")
+        planner = TeardownPlanner(self.client, max_workers=args.jobs)
+        resource_type = self.resource_client.klass.resource_type
+        plan = planner.plan(resource_type, args.uuid)
+        for i, stage in enumerate(plan, 1):
+            for item in stage:
+                print("{}: {} ({})".format(i, item, item.name),
+                      file=self.out)
+        if args.dry_run:
+            return
+
+        self.logger.info("Deleting {} resources".format(len(plan)))
+        planner.execute(plan)
+        self.logger.info("Teardown finished")
+
     def wait_for_termination(self, job, wait):
         if wait:
             self.logger.info("Waiting for job to finish")
             job = self.client.job.wait(job.uuid)
-        utils.output_json(job)
+        utils.output_json(job, self.out)
         msg = "Job {}".format("terminated" if wait else "scheduled")
         self.logger.info(msg)
         if job.status.marks_failure:
@@ -0,0 +1,92 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import time
+
+from fcoclient.batch import BatchRunner
+from fcoclient.commands.base import Command
+from fcoclient.exceptions import FCOError
+from fcoclient.journal import Journal
+
+
+class BatchCmd(Command):
+
+    # Journal path is resolved against current working directory and must
+    # be written by the invoking user, so batches always run locally.
+    forwardable = False
+
+    @staticmethod
+    def add_subparser(subparsers):
+        parser = subparsers.add_parser("batch",
+                                       help="Execute batch of operations")
+        parser.add_argument("operations", type=argparse.FileType("r"),
+                            help="File with one JSON operation per line")
+        parser.add_argument("-j", "--jobs", type=int, default=8,
+                            help="Number of concurrently submitted "
+                            "operations")
+        parser.add_argument("-n", "--no-wait", action="store_true",
+                            help="Do not wait for jobs to terminate")
+        parser.add_argument("--poll-interval", type=float, default=5,
+                            help="Number of seconds between job polls")
+        parser.add_argument("--journal",
+                            help="Record progress into selected file")
+        parser.add_argument("-r", "--resume", action="store_true",
+                            help="Resume batch, recorded in journal")
+        parser.add_argument("--retry-unknown", action="store_true",
+                            help="Resubmit operations with unknown outcome")
+        return parser
+
+    def batch(self, args):
+        self.logger.info("Executing batch")
+        journal = self._open_journal(args)
+        runner = BatchRunner(self.client, max_workers=args.jobs,
+                             wait=not args.no_wait,
+                             poll_interval=args.poll_interval,
+                             journal=journal,
+                             retry_unknown=args.retry_unknown)
+        start = time.time()
+        try:
+            failed = runner.run(args.operations, self._report)
+        finally:
+            if journal is not None:
+                journal.close()
+        msg = "Batch executed in {:.1f} s"
+        self.logger.info(msg.format(time.time() - start))
+        if failed > 0:
+            raise FCOError("{} operation(s) failed".format(failed))
+
+    def _open_journal(self, args):
+        if args.journal is None:
+            if args.resume:
+                raise FCOError("Resuming batch requires journal")
+            return None
+
+        exists = (os.path.exists(args.journal) and
+                  os.path.getsize(args.journal) > 0)
+        if exists and not args.resume:
+            msg = "Journal {} already exists, use --resume to continue"
+            raise FCOError(msg.format(args.journal))
+        if args.resume:
+            self.logger.info("Resuming batch from {}".format(args.journal))
+        return Journal(args.journal)
+
+    def _report(self, result):
+        print(json.dumps(result, sort_keys=True), file=self.out)
+        self.out.flush()
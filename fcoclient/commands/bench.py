@@ -0,0 +1,89 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import print_function
+
+import argparse
+import json
+
+from fcoclient import loadgen, utils
+from fcoclient.commands.base import Command
+from fcoclient.resources.base import ResourceType
+
+
+class BenchCmd(Command):
+
+    forwardable = False
+
+    @staticmethod
+    def add_subparser(subparsers):
+        parser = subparsers.add_parser("bench",
+                                       help="Generate load on FCO")
+        parser.add_argument("-m", "--mix", default="list=1,get=5",
+                            help="Comma separated operation=weight pairs, "
+                            "operations: {}".format(
+                                ", ".join(loadgen.OPERATIONS)
+                            ))
+        parser.add_argument("-w", "--workers", type=int, default=8,
+                            help="Number of concurrent workers")
+        parser.add_argument("-d", "--duration", type=float,
+                            help="Run for selected number of seconds")
+        parser.add_argument("-n", "--requests", type=int,
+                            help="Stop after selected number of operations")
+        parser.add_argument("-r", "--resource", default="server",
+                            choices=[t.name for t in ResourceType
+                                     if t != ResourceType.any],
+                            help="Resource type used by list and get")
+        parser.add_argument("-p", "--page-size", type=int, default=100,
+                            help="Number of items retrieved by list")
+        parser.add_argument("-s", "--skeleton", type=argparse.FileType("r"),
+                            help="Disk skeleton used by create")
+        parser.add_argument("-o", "--output", choices=("text", "json"),
+                            default="text", help="Output format")
+        return parser
+
+    def bench(self, args):
+        skeleton = None
+        if args.skeleton is not None:
+            skeleton = json.load(args.skeleton)
+        generator = loadgen.LoadGenerator(
+            self.client, loadgen.parse_mix(args.mix), workers=args.workers,
+            duration=args.duration, requests=args.requests,
+            resource=args.resource, page_size=args.page_size,
+            skeleton=skeleton,
+        )
+
+        self.logger.info("Generating load")
+        results = generator.run()
+        self.logger.info("Load generated")
+
+        if args.output == "json":
+            utils.output_json(results, self.out)
+            print(file=self.out)
+            return
+
+        row = "{:<8} {:>7} {:>8} {:>7} {:>9} {:>9} {:>9} {:>9}"
+        print(row.format("op", "count", "rps", "errors", "p50 [ms]",
+                         "p90 [ms]", "p99 [ms]", "max [ms]"), file=self.out)
+        for name, op in sorted(results["operations"].items()):
+            print(row.format(
+                name, op["count"], "{:.1f}".format(op["rps"]), op["errors"],
+                *("{:.1f}".format(op[k]) if k in op else "-"
+                  for k in ("p50_ms", "p90_ms", "p99_ms", "max_ms"))
+            ), file=self.out)
+        msg = "Total: {} operations in {:.1f} s, {:.1f} rps, {:.2%} errors"
+        print(msg.format(results["count"], results["seconds"],
+                         results["rps"], results["error_rate"]),
+              file=self.out)
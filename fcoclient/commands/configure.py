@@ -22,6 +22,7 @@ from fcoclient.config import Config
 class ConfigureCmd(Command):
 
     require_client = False
+    forwardable = False
 
     @staticmethod
     def add_subparser(subparsers):
@@ -14,6 +14,7 @@
 # limitations under the License.
 
 from fcoclient.commands.base import Command
+from fcoclient.resources.job import JobStatus
 
 
 class JobCmd(Command):
@@ -27,15 +28,49 @@ class JobCmd(Command):
         Command.create_get_parser(subs, "job")
         Command.create_list_parser(subs, "jobs")
 
+        sub = subs.add_parser("purge", help="Delete terminated jobs")
+        sub.add_argument("-o", "--older-than", type=float,
+                         help="Only delete jobs that terminated more than "
+                         "selected number of days ago")
+        sub.add_argument("-s", "--status", action="append",
+                         choices=[s.value for s in JobStatus if s.is_terminal],
+                         help="Only delete jobs with selected status")
+        sub.add_argument("-j", "--jobs", type=int, default=8,
+                         help="Number of parallel delete requests")
+        sub.add_argument("-p", "--page-size", type=int, default=100,
+                         help="Number of jobs to retrieve in single request")
+
         return parser
 
     @property
     def resource_client(self):
         return self.client.job
 
+    @staticmethod
+    def format_item(job):
+        return "{} ({})".format(job["itemDescription"], job.uuid)
+
     def list(self, args):
         self.logger.info("Listing jobs")
         conditions = self.parse_filter(args.filter)
-        for job in self.client.job.list(args.no_items, **conditions):
-            print("{} ({})".format(job["itemDescription"], job.uuid))
+        self.output_items(args, conditions)
         self.logger.info("Jobs listed")
+
+    def purge(self, args):
+        self.logger.info("Purging jobs")
+        older_than = None
+        if args.older_than is not None:
+            older_than = args.older_than * 24 * 3600
+        statuses = None
+        if args.status is not None:
+            statuses = [JobStatus(s) for s in args.status]
+        deleted = self.client.job.purge(
+            older_than=older_than, statuses=statuses, max_workers=args.jobs,
+            page_size=args.page_size, progress=self._report_progress
+        )
+        self.logger.info("Jobs purged: {}".format(deleted))
+
+    def _report_progress(self, deleted, elapsed):
+        rate = deleted / elapsed if elapsed > 0 else 0.0
+        msg = "Deleted {} jobs in {:.1f} s ({:.1f} jobs/s)"
+        self.logger.info(msg.format(deleted, elapsed, rate))
@@ -25,6 +25,7 @@ class NetworkCmd(Command):
 
         Command.create_get_parser(subs, "network")
         Command.create_list_parser(subs, "networks")
+        Command.create_teardown_parser(subs, "network")
 
         return parser
 
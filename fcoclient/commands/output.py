@@ -0,0 +1,173 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Writers that serialize resources on command line.
+
+All writers are streaming writers: records are written as soon as they are
+passed to the writer and output is flushed after each batch, which means that
+downstream consumers can start processing before the listing is complete.
+"""
+
+from __future__ import print_function
+
+import csv
+import json
+import logging
+
+from fcoclient import utils
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("text", "json", "ndjson", "csv")
+
+
+class Writer(object):
+    """
+    Base writer.
+    """
+
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, items):
+        """
+        Write a batch of items and flush the output.
+
+        Args:
+            items: List of resources.
+        """
+        for item in items:
+            self.write_item(item)
+        self.out.flush()
+
+    def write_item(self, item):
+        raise NotImplementedError("Writer is an abstract class")
+
+    def close(self):
+        """
+        Write trailing data, if any.
+        """
+        self.out.flush()
+
+
+class TextWriter(Writer):
+    """
+    Writer that outputs single formatted line per item.
+    """
+
+    def __init__(self, out, formatter):
+        super(TextWriter, self).__init__(out)
+        self.formatter = formatter
+
+    def write_item(self, item):
+        print(self.formatter(item), file=self.out)
+
+
+class JsonWriter(Writer):
+    """
+    Writer that outputs JSON array, one item per line.
+    """
+
+    def __init__(self, out):
+        super(JsonWriter, self).__init__(out)
+        self.separator = "[\n"
+
+    def write_item(self, item):
+        self.out.write(self.separator)
+        self.out.write(json.dumps(item, sort_keys=True))
+        self.separator = ",\n"
+
+    def close(self):
+        self.out.write("[]\n" if self.separator == "[\n" else "\n]\n")
+        super(JsonWriter, self).close()
+
+
+class NdjsonWriter(Writer):
+    """
+    Writer that outputs newline delimited JSON.
+    """
+
+    def write_item(self, item):
+        self.out.write(json.dumps(item, sort_keys=True))
+        self.out.write("\n")
+
+
+class CsvWriter(Writer):
+    """
+    Writer that outputs CSV.
+
+    Columns are determined from the first batch of items, since header must
+    be written before any rows. Fields that first appear in later batches
+    cannot be added and are dropped with a warning. Nested values are
+    serialized as JSON.
+    """
+
+    def __init__(self, out):
+        super(CsvWriter, self).__init__(out)
+        self.writer = None
+        self.dropped = set()
+
+    def write(self, items):
+        if self.writer is None and len(items) > 0:
+            fields = sorted(set(k for item in items for k in item))
+            self.writer = csv.DictWriter(self.out, fields,
+                                         extrasaction="ignore")
+            self.writer.writeheader()
+        super(CsvWriter, self).write(items)
+
+    def write_item(self, item):
+        extra = set(item) - set(self.writer.fieldnames) - self.dropped
+        if len(extra) > 0:
+            self.dropped.update(extra)
+            msg = "Fields missing from CSV header are dropped: {}"
+            logger.warning(msg.format(", ".join(sorted(extra))))
+        self.writer.writerow({
+            k: json.dumps(v) if isinstance(v, (dict, list)) else v
+            for k, v in item.items()
+        })
+
+
+class PrettyJsonWriter(Writer):
+    """
+    Writer that outputs single item as indented JSON.
+    """
+
+    def write_item(self, item):
+        utils.output_json(item, self.out)
+
+
+def create_writer(fmt, out, formatter=None):
+    """
+    Create writer for selected format.
+
+    Args:
+        fmt (str): One of the ``FORMATS``.
+        out: File like object that receives output.
+        formatter: Callable that converts item into a line of text. Only
+            used by ``text`` format.
+
+    Returns:
+        :obj:`Writer`: New writer.
+    """
+    if fmt == "text":
+        return TextWriter(out, formatter)
+    if fmt == "json":
+        return JsonWriter(out)
+    if fmt == "ndjson":
+        return NdjsonWriter(out)
+    if fmt == "csv":
+        return CsvWriter(out)
+    raise ValueError("Invalid output format: {}".format(fmt))
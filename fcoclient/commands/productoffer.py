@@ -39,7 +39,10 @@ class ProductOfferCmd(Command):
         conditions = {}
         if args.type is not None:
             conditions["productAssociatedType"] = args.type
-        for po in self.client.productoffer.list(args.no_items, **conditions):
-            print("{}: {} ({})".format(po["productAssociatedType"], po.name,
-                                       po.uuid))
+        self.output_items(args, conditions)
         self.logger.info("Offers listed")
+
+    @staticmethod
+    def format_item(po):
+        return "{}: {} ({})".format(po["productAssociatedType"], po.name,
+                                    po.uuid)
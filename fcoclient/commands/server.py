@@ -32,6 +32,7 @@ class ServerCmd(Command):
         sub.add_argument("-k", "--key-uuid", action="append",
                          help="UUID of the ssh key to install on server")
         Command.create_delete_parser(subs, "server")
+        Command.create_teardown_parser(subs, "server")
 
         sub = subs.add_parser("start", help="Start server")
         sub.add_argument("uuid", help="UUID of the server")
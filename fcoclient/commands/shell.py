@@ -0,0 +1,103 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import print_function
+
+import shlex
+import sys
+
+try:
+    import readline  # noqa
+except ImportError:
+    pass
+
+from fcoclient import cli
+from fcoclient.commands.base import Command
+
+
+class ShellCmd(Command):
+
+    forwardable = False
+
+    @staticmethod
+    def add_subparser(subparsers):
+        parser = subparsers.add_parser("shell",
+                                       help="Run commands interactively")
+        parser.add_argument("--cache-ttl", type=float, default=30,
+                            help="Number of seconds that resources are "
+                            "cached (0 disables cache)")
+        parser.add_argument("--cache-size", type=int, default=1000,
+                            help="Maximum number of cached resources")
+        return parser
+
+    def shell(self, args):
+        self.logger.info("Starting interactive shell (exit with Ctrl+D)")
+        if args.cache_ttl > 0:
+            self.client.enable_cache(args.cache_ttl, args.cache_size)
+
+        parsers = {}
+        while True:
+            try:
+                line = self._read_line("fco> ")
+            except EOFError:
+                print()
+                break
+            except KeyboardInterrupt:
+                print()
+                continue
+
+            try:
+                argv = shlex.split(line)
+            except ValueError as e:
+                self.logger.error(e)
+                continue
+            if len(argv) == 0:
+                continue
+            if argv[0] in ("exit", "quit"):
+                break
+            if argv[0] == "help":
+                argv = ["--help"]
+
+            self._run(argv, parsers)
+
+        self.logger.info("Shell terminated")
+
+    def _run(self, argv, parsers):
+        name = cli.select_command(argv)
+        if name == "shell":
+            self.logger.error("Shell is already running")
+            return
+
+        # Parser only knows about the selected command, so we keep one
+        # parser per command and reuse it for subsequent invocations.
+        parser = parsers.get(name)
+        if parser is None:
+            parser = parsers[name] = cli.create_parser(argv)
+        try:
+            args = parser.parse_args(argv)
+        except SystemExit:
+            return
+
+        try:
+            cli.execute(args, self.client, self.logger)
+        except KeyboardInterrupt:
+            self.logger.error("Command interrupted")
+
+    @staticmethod
+    def _read_line(text):
+        if sys.version_info[0] > 2:
+            return input(text)
+        else:
+            return raw_input(text)  # noqa
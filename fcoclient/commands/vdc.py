@@ -13,6 +13,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from __future__ import print_function
+
+from fcoclient import utils
+from fcoclient.commands import output
 from fcoclient.commands.base import Command
 
 
@@ -26,9 +30,37 @@ class VdcCmd(Command):
 
         Command.create_get_parser(subs, "virtual data center")
         Command.create_list_parser(subs, "virtual data centers")
+        Command.create_teardown_parser(subs, "virtual data center")
+
+        sub = subs.add_parser("dump", help="Export everything that resides "
+                              "in virtual data center")
+        sub.add_argument("uuid", help="UUID of the virtual data center")
+        sub.add_argument("-o", "--output", choices=("json", "ndjson"),
+                         default="json", help="Output format")
+        sub.add_argument("-j", "--jobs", type=int, default=7,
+                         help="Number of parallel list requests")
+        sub.add_argument("-p", "--page-size", type=int, default=100,
+                         help="Number of resources to retrieve in single "
+                         "request")
 
         return parser
 
     @property
     def resource_client(self):
         return self.client.vdc
+
+    def dump(self, args):
+        self.logger.info("Taking snapshot")
+        snapshot = self.client.vdc.snapshot(args.uuid, max_workers=args.jobs,
+                                            page_size=args.page_size)
+        if args.output == "json":
+            utils.output_json(snapshot.to_dict(), self.out)
+            print(file=self.out)
+        else:
+            writer = output.NdjsonWriter(self.out)
+            writer.write(list(snapshot.records()))
+            writer.close()
+        self.logger.info("Snapshot taken: {} resources, {} links".format(
+            sum(len(items) for items in snapshot.resources.values()),
+            len(snapshot.links)
+        ))
@@ -21,7 +21,10 @@ from fcoclient.exceptions import InvalidConfigError
 
 class Config(dict):
 
-    valid_keys = {"url", "username", "customer", "password", "verify"}
+    valid_keys = {
+        "url", "username", "customer", "password", "verify", "rate_limit",
+        "timeout", "circuit_breaker", "transport",
+    }
 
     def __init__(self, **data):
         invalid = [k for k in data.keys() if k not in self.valid_keys]
@@ -87,6 +87,18 @@ class APICallError(FCOError):
         super(APICallError, self).__init__(request.text)
 
 
+class APIConnectionError(FCOError):
+    """
+    This exception is raised when FCO API cannot be reached.
+    """
+
+
+class CircuitOpenError(APIConnectionError):
+    """
+    This exception is raised when call is rejected by open circuit breaker.
+    """
+
+
 class InvalidConfigError(FCOError):
     """
     This exception is raised on broken config file.
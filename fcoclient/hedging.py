@@ -0,0 +1,256 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module with hedging of read requests.
+
+Hedged request is sent when the original request takes longer than most
+requests of its kind. Whichever response arrives first is used and the
+other one is ignored. Only idempotent reads (``GET`` requests and list
+queries) are hedged, calls that change resources are never duplicated.
+"""
+
+import collections
+import threading
+import time
+
+from concurrent import futures
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+class HedgingPolicy(object):
+    """
+    Policy that decides when to send hedged requests and sends them.
+
+    Hedging delay is the selected percentile of recent latencies of reads
+    of the same kind (single resource reads and list queries are tracked
+    separately). No request is hedged until ``min_samples`` latencies have
+    been observed, unless fixed ``delay`` is set.
+
+    Extra load is limited by budget: each hedgeable request earns
+    ``budget`` tokens and each hedged request spends one token. With the
+    default budget of 0.05 at most about 5% of reads are sent twice. Hedged
+    requests also obey rate limits: request is not hedged if limits do not
+    allow another request right away.
+
+    Once the delay is known, requests are sent from worker threads that are
+    started on demand and reused, so concurrent requests never queue behind
+    each other and workers keep their connections open.
+    """
+
+    def __init__(self, percentile=95, delay=None, budget=0.05,
+                 min_samples=20, history=1000):
+        """
+        Construct hedging policy.
+
+        Args:
+            percentile (float): Latency percentile that is used as hedging
+                delay.
+            delay (float): Fixed hedging delay in seconds. Overrides
+                ``percentile`` if set.
+            budget (float): Fraction of reads that can be hedged.
+            min_samples (int): Number of observed latencies needed before
+                percentile based delay is used.
+            history (int): Number of recent latencies that are kept per kind
+                of read.
+        """
+        self.percentile = percentile
+        self.delay = delay
+        self.budget = budget
+        self.min_samples = min_samples
+        self.requests = 0
+        self.hedged = 0
+        self.wins = 0
+        self._latencies = collections.defaultdict(
+            lambda: collections.deque(maxlen=history)
+        )
+        self._tokens = 0.0
+        self._workers = _Workers()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def applies(method, endpoint):
+        """
+        Check whether API call is idempotent read.
+
+        Args:
+            method (str): HTTP method.
+            endpoint (str): Relative resource path.
+
+        Returns:
+            True if call can be hedged.
+        """
+        return method == "GET" or endpoint.endswith("/list")
+
+    def send(self, transport, method, endpoint, url, data, profiler=None,
+             rate_limiter=None):
+        """
+        Send request and hedge it if it is slow.
+
+        Args:
+            transport (:obj:`Transport`): Transport that sends requests.
+            method (str): HTTP method.
+            endpoint (str): Relative resource path.
+            url (str): Full URL of the endpoint.
+            data: JSON serializable payload or ``None``.
+            profiler (:obj:`Profiler`): Profiler that should receive
+                timings of the original request or ``None``.
+            rate_limiter (:obj:`RateLimiter`): Limiter that hedged request
+                must pass. Original request is expected to be limited by the
+                caller.
+
+        Returns:
+            Response that arrived first.
+
+        Raises:
+            APIConnectionError: If neither request produced a response.
+        """
+        kind = "list" if endpoint.endswith("/list") else "read"
+        delay = self._hedge_delay(kind)
+        if delay is None:
+            return self._observe(kind, transport.send, method, url, data,
+                                 profiler)
+
+        primary = self._workers.submit(self._observe, kind, transport.send,
+                                       method, url, data, profiler)
+        done, _ = futures.wait([primary], timeout=delay)
+        if done or not self._spend_token():
+            return primary.result()
+
+        hedge = self._workers.submit(self._hedge, rate_limiter,
+                                     transport.send, method, endpoint, url,
+                                     data)
+        pending = [primary, hedge]
+        while True:
+            done, _ = futures.wait(pending,
+                                   return_when=futures.FIRST_COMPLETED)
+            for future in (primary, hedge):
+                # Hedge that limiter did not allow has no result.
+                if (future in done and future.exception() is None and
+                        future.result() is not None):
+                    if future is hedge:
+                        with self._lock:
+                            self.wins += 1
+                    return future.result()
+            pending = [f for f in pending if f not in done]
+            if len(pending) == 0:
+                return primary.result()
+
+    def _hedge(self, rate_limiter, send, method, endpoint, url, data):
+        if rate_limiter is None:
+            return send(method, url, data)
+        with rate_limiter.limit(method, endpoint, blocking=False) as allowed:
+            if not allowed:
+                self._refund_token()
+                return None
+            return send(method, url, data)
+
+    def _observe(self, kind, send, method, url, data, profiler):
+        start = time.time()
+        response = send(method, url, data, profiler)
+        with self._lock:
+            self._latencies[kind].append(time.time() - start)
+        return response
+
+    def _hedge_delay(self, kind):
+        with self._lock:
+            self.requests += 1
+            self._tokens = min(self._tokens + self.budget, 10.0)
+            if self.delay is not None:
+                return self.delay
+            latencies = self._latencies[kind]
+            if len(latencies) < self.min_samples:
+                return None
+            latencies = sorted(latencies)
+        index = int(len(latencies) * self.percentile / 100.0)
+        return latencies[min(len(latencies) - 1, index)]
+
+    def _spend_token(self):
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            self.hedged += 1
+            return True
+
+    def _refund_token(self):
+        # Hedge that was not sent costs nothing.
+        with self._lock:
+            self._tokens += 1.0
+            self.hedged -= 1
+
+
+class _Workers(object):
+    """
+    Threads that are started on demand and reused while they are busy.
+
+    Unlike fixed size thread pool, tasks never queue behind each other: new
+    thread is started whenever no thread is idle. Idle threads exit after
+    ``idle_timeout`` seconds. Reusing threads keeps their thread-local http
+    sessions (and with them open connections) alive.
+    """
+
+    def __init__(self, idle_timeout=60):
+        self.idle_timeout = idle_timeout
+        self._tasks = queue.Queue()
+        self._idle = 0
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args):
+        """
+        Call function in a worker thread.
+
+        Returns:
+            Future that holds result of the call.
+        """
+        future = futures.Future()
+        with self._lock:
+            start = self._idle == 0
+            if not start:
+                self._idle -= 1
+        self._tasks.put((future, func, args))
+        if start:
+            thread = threading.Thread(target=self._run, name="fco-hedging")
+            thread.daemon = True
+            thread.start()
+        return future
+
+    def _run(self):
+        while True:
+            try:
+                future, func, args = self._tasks.get(
+                    timeout=self.idle_timeout
+                )
+            except queue.Empty:
+                with self._lock:
+                    # Idle count of zero means that a task was submitted for
+                    # this thread in the meantime.
+                    if self._idle > 0:
+                        self._idle -= 1
+                        return
+                continue
+
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(func(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            del future, func, args
+            with self._lock:
+                self._idle += 1
@@ -0,0 +1,114 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module with append-only journal of bulk operations.
+
+Journal records progress of each operation of a bulk run, which makes it
+possible to resume interrupted run without repeating work that has already
+been done. Journal is a file with one JSON document per line. Each document
+has a ``key`` that identifies the operation and an ``event``:
+
+  * ``submitting`` is recorded right before operation is sent to FCO,
+  * ``submitted`` is recorded when FCO accepted the operation and holds the
+    ``job`` UUID,
+  * ``finished`` is recorded when job terminated and holds its ``status``,
+  * ``failed`` is recorded when operation could not be submitted.
+"""
+
+import json
+import os
+import threading
+
+
+class Journal(object):
+    """
+    Append-only journal of operations.
+    """
+
+    events = ("submitting", "submitted", "finished", "failed")
+
+    def __init__(self, path, sync=False):
+        """
+        Open journal, loading any entries that are already present.
+
+        Truncated last line (left behind by a crash) is ignored.
+
+        Args:
+            path (str): Path to the journal file.
+            sync (bool): Call ``fsync`` after each entry. This protects
+                against data loss on power failure at the cost of speed.
+        """
+        self.path = path
+        self.sync = sync
+        self._entries = {}
+        self._lock = threading.Lock()
+
+        terminated = True
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    terminated = line.endswith("\n")
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._entries[entry["key"]] = entry
+        self._file = open(path, "a")
+        if not terminated:
+            self._file.write("\n")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Retrieve last entry for the operation.
+
+        Args:
+            key (str): Operation key.
+
+        Returns:
+            Dictionary with last entry or ``None`` if operation has no
+            entries.
+        """
+        with self._lock:
+            return self._entries.get(key)
+
+    def record(self, key, event, **fields):
+        """
+        Append entry to the journal.
+
+        Args:
+            key (str): Operation key.
+            event (str): One of the ``events``.
+            **fields: Additional fields to store.
+        """
+        assert event in self.events, "Invalid event: {}".format(event)
+        entry = dict(fields, key=key, event=event)
+        line = json.dumps(entry, sort_keys=True) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if self.sync:
+                os.fsync(self._file.fileno())
+            self._entries[key] = entry
+
+    def close(self):
+        """
+        Close journal file.
+        """
+        with self._lock:
+            self._file.close()
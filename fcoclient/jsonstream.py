@@ -0,0 +1,141 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module with incremental decoding of JSON documents.
+
+Decoder reads document from a sequence of byte chunks and yields elements of
+an array that is stored under selected key of the top-level object as soon
+as each element is complete. Only the element that is being decoded and the
+current chunk are kept in memory.
+"""
+
+import codecs
+import json
+import re
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+class _Reader(object):
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+
+    def more(self, size=1):
+        """
+        Append at least ``size`` characters to the buffer.
+
+        Returns:
+            False if document ended before anything was appended.
+        """
+        parts = [self.buffer[self.pos:]]
+        added = 0
+        for chunk in self._chunks:
+            text = self._text.decode(chunk)
+            parts.append(text)
+            added += len(text)
+            if added > 0 and added >= size:
+                break
+        else:
+            parts.append(self._text.decode(b"", True))
+            added += len(parts[-1])
+        self.buffer = "".join(parts)
+        self.pos = 0
+        return added > 0
+
+    def peek(self):
+        """
+        Skip whitespace and return next character (empty string at the end).
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.more():
+                return ""
+
+    def expect(self, chars):
+        char = self.peek()
+        if char == "" or char not in chars:
+            msg = "Expecting one of {!r}, found {!r}".format(chars, char)
+            raise ValueError(msg)
+        self.pos += 1
+        return char
+
+    def value(self):
+        """
+        Decode next JSON value, reading more chunks as needed.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                end = None
+            # Value that ends with the buffer might continue in next chunk
+            # (for example, number 12 might actually be 123).
+            if end is not None and end < len(self.buffer):
+                self.pos = end
+                return value
+            # Doubling the amount of requested text keeps decoding of values
+            # that span many chunks linear.
+            if not self.more(len(self.buffer) - self.pos):
+                if end is None:
+                    raise ValueError("Truncated JSON document")
+                self.pos = end
+                return value
+
+
+def iter_array(chunks, key):
+    """
+    Decode array from JSON object incrementally.
+
+    Args:
+        chunks: Iterable of byte strings that form UTF-8 encoded JSON
+            document with an object at the top level.
+        key (str): Name of the field that holds the array.
+
+    Yields:
+        Decoded elements of the array. Nothing is yielded if field is
+        missing or ``null``.
+
+    Raises:
+        ValueError: If document is not valid JSON.
+    """
+    reader = _Reader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name != key or reader.peek() == "n":
+            reader.value()
+        else:
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.expect(",]") == "]":
+                        break
+        if reader.expect(",}") == "}":
+            return
@@ -0,0 +1,248 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module with load generator that stress-tests FCO through the client.
+
+Generator runs a weighted mix of operations using concurrent workers:
+
+  * ``list`` - list page of resources,
+  * ``get`` - retrieve single resource by UUID,
+  * ``poll`` - retrieve single job by UUID, like job waiting does,
+  * ``create`` - create disk from skeleton,
+  * ``delete`` - delete disk that was created by ``create`` operation.
+
+Disks that are still present when the run ends are deleted, but these
+deletions are not measured.
+"""
+
+import random
+import threading
+import time
+
+from fcoclient.exceptions import FCOError
+
+OPERATIONS = ("list", "get", "poll", "create", "delete")
+
+
+def parse_mix(text):
+    """
+    Parse operation mix.
+
+    Args:
+        text (str): Comma separated ``operation=weight`` pairs, for example
+            ``list=2,get=5,poll=3``.
+
+    Returns:
+        Dictionary that maps operation names to weights.
+
+    Raises:
+        FCOError: If mix is not valid.
+    """
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise FCOError("Invalid operation: {}".format(name))
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise FCOError("Invalid weight: {}".format(weight))
+    if sum(mix.values()) <= 0:
+        raise FCOError("Operation mix has no weight")
+    return mix
+
+
+def _percentile(values, percent):
+    return values[min(len(values) - 1, int(len(values) * percent / 100.0))]
+
+
+class LoadGenerator(object):
+    """
+    Drives operation mix through a client.
+    """
+
+    def __init__(self, client, mix, workers=8, duration=None, requests=None,
+                 resource="server", page_size=100, skeleton=None):
+        """
+        Construct load generator.
+
+        Args:
+            client (:obj:`Client`): Client that executes operations.
+            mix: Dictionary that maps operation names to weights.
+            workers (int): Number of concurrent workers.
+            duration (float): Run for this many seconds.
+            requests (int): Stop after this many operations. If both
+                ``duration`` and ``requests`` are set, run stops when the
+                first limit is reached.
+            resource (str): Resource type used by ``list`` and ``get``.
+            page_size (int): Number of items retrieved by ``list``.
+            skeleton (:obj:`Disk`): Disk skeleton used by ``create``.
+
+        Raises:
+            FCOError: If configuration is not valid.
+        """
+        if duration is None and requests is None:
+            raise FCOError("Duration or number of requests must be set")
+        if ("create" in mix or "delete" in mix) and skeleton is None:
+            raise FCOError("Disk skeleton is needed to create disks")
+        self.client = client
+        self.names = sorted(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.workers = workers
+        self.duration = duration
+        self.requests = requests
+        self.resource_client = getattr(client, resource)
+        self.page_size = page_size
+        self.skeleton = skeleton
+        self._lock = threading.Lock()
+        self._started = 0
+        self._deadline = None
+        self._uuids = []
+        self._jobs = []
+        self._disks = []
+
+    def run(self):
+        """
+        Execute load test.
+
+        Returns:
+            Dictionary with overall and per operation results.
+        """
+        self._prepare()
+        self._started = 0
+        start = time.time()
+        if self.duration is not None:
+            self._deadline = start + self.duration
+
+        results = [[] for _ in range(self.workers)]
+        threads = [threading.Thread(target=self._work, args=(samples,))
+                   for samples in results]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - start
+
+        self._cleanup()
+        return self._summarize([s for r in results for s in r], elapsed)
+
+    def _prepare(self):
+        """
+        Collect UUIDs that ``get`` and ``poll`` operations use.
+        """
+        if "get" in self.names:
+            items = self.resource_client.list(self.page_size)
+            if len(items) == 0:
+                raise FCOError("No resources to get")
+            self._uuids = [item.uuid for item in items]
+        if "poll" in self.names:
+            self._jobs = [job.uuid for job in self.client.job.list(100)]
+            if len(self._jobs) == 0 and "create" not in self.names:
+                raise FCOError("No jobs to poll, add create to the mix")
+
+    def _next(self):
+        with self._lock:
+            if self.requests is not None and self._started >= self.requests:
+                return None
+            self._started += 1
+        if self._deadline is not None and time.time() >= self._deadline:
+            return None
+        point = random.uniform(0, sum(self.weights))
+        for name, weight in zip(self.names, self.weights):
+            point -= weight
+            if point <= 0:
+                return name
+        return self.names[-1]
+
+    def _work(self, samples):
+        while True:
+            name = self._next()
+            if name is None:
+                return
+            start = time.time()
+            error = None
+            try:
+                getattr(self, "_op_" + name)()
+            except Exception as e:
+                # Load test should survive any failure of a single
+                # operation, including malformed responses.
+                error = type(e).__name__
+            samples.append((name, time.time() - start, error))
+
+    def _op_list(self):
+        self.resource_client.list(self.page_size)
+
+    def _op_get(self):
+        self.resource_client.get(uuid=random.choice(self._uuids))
+
+    def _op_poll(self):
+        with self._lock:
+            uuid = random.choice(self._jobs) if self._jobs else None
+        if uuid is None:
+            raise FCOError("No jobs to poll")
+        self.client.job.get(uuid=uuid)
+
+    def _op_create(self):
+        job = self.client.disk.create(self.skeleton)
+        with self._lock:
+            self._jobs.append(job.uuid)
+            self._disks.append(job.monitored_item_uuid)
+
+    def _op_delete(self):
+        with self._lock:
+            uuid = self._disks.pop() if self._disks else None
+        if uuid is None:
+            raise FCOError("No disks to delete")
+        job = self.client.disk.delete(uuid)
+        with self._lock:
+            self._jobs.append(job.uuid)
+
+    def _cleanup(self):
+        for uuid in self._disks:
+            try:
+                self.client.disk.delete(uuid)
+            except FCOError:
+                pass
+        self._disks = []
+
+    def _summarize(self, samples, elapsed):
+        operations = {}
+        for name in self.names:
+            latencies = sorted(s[1] for s in samples if s[0] == name)
+            errors = {}
+            for sample in samples:
+                if sample[0] == name and sample[2] is not None:
+                    errors[sample[2]] = errors.get(sample[2], 0) + 1
+            result = dict(count=len(latencies), rps=len(latencies) / elapsed,
+                          errors=sum(errors.values()), error_types=errors,
+                          error_rate=0.0)
+            if len(latencies) > 0:
+                result["error_rate"] = result["errors"] / float(len(latencies))
+                for percent in (50, 90, 99):
+                    result["p{}_ms".format(percent)] = _percentile(
+                        latencies, percent
+                    ) * 1000
+                result["max_ms"] = latencies[-1] * 1000
+            operations[name] = result
+
+        errors = sum(op["errors"] for op in operations.values())
+        return dict(
+            seconds=elapsed, workers=self.workers, count=len(samples),
+            rps=len(samples) / elapsed, errors=errors,
+            error_rate=errors / float(max(len(samples), 1)),
+            operations=operations,
+        )
@@ -0,0 +1,130 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module with logging setup for command line client.
+
+Log file receives structured records, one JSON document per line. Writing
+to the file is done by a background thread, which means that code that logs
+in tight loops (bulk operations, job polling) only pays for putting the
+record into a queue. On Python versions without
+:class:`logging.handlers.QueueHandler`, file is written synchronously.
+"""
+
+import json
+import logging
+import time
+
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+# Attributes that every log record has. Everything else was passed to the
+# logger using ``extra`` argument and is added to the JSON document.
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord(
+    "", logging.INFO, "", 0, "", (), None
+))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formatter that serializes log records into single line JSON documents.
+
+    Fields that were passed to the logger using ``extra`` argument are
+    included in the document.
+    """
+
+    def format(self, record):
+        data = dict(
+            time="{}.{:03d}Z".format(
+                time.strftime("%Y-%m-%dT%H:%M:%S",
+                              time.gmtime(record.created)),
+                int(record.msecs)
+            ),
+            level=record.levelname,
+            logger=record.name,
+            line=record.lineno,
+            thread=record.threadName,
+            message=record.getMessage(),
+        )
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        return json.dumps(data, sort_keys=True, default=str)
+
+
+def configure(level="DEBUG", path=".fco.log", max_bytes=10 * 1024 * 1024,
+              backup_count=3):
+    """
+    Configure ``fcoclient`` logger.
+
+    Messages of level INFO and above are printed to standard error. All
+    messages of selected level and above are written to rotating log file.
+
+    Args:
+        level (str): Minimal level of messages that are logged. Debug
+            messages (including per-request timings) are not even created
+            when level is above DEBUG.
+        path (str): Path to the log file.
+        max_bytes (int): Size of the log file that triggers rotation.
+        backup_count (int): Number of rotated log files to keep.
+
+    Returns:
+        Configured logger.
+    """
+    # Handlers module pulls in socket and pickle, which is why it is only
+    # imported when logging is actually configured.
+    import logging.handlers
+
+    handler_stream = logging.StreamHandler()
+    handler_stream.setFormatter(
+        logging.Formatter("[%(levelname)s] - %(message)s")
+    )
+    handler_stream.setLevel(logging.INFO)
+
+    handler_file = logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count
+    )
+    handler_file.setFormatter(JsonFormatter())
+
+    log = logging.getLogger("fcoclient")
+    log.addHandler(handler_stream)
+    log.addHandler(_make_async(handler_file))
+    log.setLevel(level)
+
+    return log
+
+
+def _make_async(handler):
+    """
+    Move handler to a background thread if platform supports it.
+    """
+    import atexit
+    import logging.handlers
+
+    try:
+        import queue
+    except ImportError:
+        import Queue as queue
+
+    if not hasattr(logging.handlers, "QueueListener"):
+        return handler
+
+    records = queue.Queue()
+    listener = logging.handlers.QueueListener(records, handler,
+                                              respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return logging.handlers.QueueHandler(records)
@@ -0,0 +1,217 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module with metrics of API calls.
+
+Registry collects per-endpoint call counts, status codes, errors, payload
+sizes and latency histograms by attaching hooks to :obj:`APIClient`. UUIDs
+in endpoints are replaced by ``{uuid}`` placeholder, which keeps number of
+distinct endpoints small. Streamed responses without ``Content-Length``
+header are not included in received payload sizes.
+"""
+
+import re
+import threading
+
+from fcoclient import exceptions
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+"""Default upper bounds (in seconds) of latency histogram buckets."""
+
+_UUID_RE = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.I
+)
+
+
+def _body_size(response):
+    # Streamed responses are consumed after hooks run, so their size is taken
+    # from headers. Reading the body here would load it into memory.
+    length = getattr(response, "headers", {}).get("Content-Length")
+    if length is not None:
+        return int(length)
+    if getattr(response, "streamed", False):
+        return None
+    return len(response.content)
+
+
+class _EndpointStats(object):
+
+    def __init__(self, buckets):
+        self.statuses = {}
+        self.errors = {}
+        self.buckets = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.sent = 0
+        self.received = 0
+
+    def observe(self, buckets, duration):
+        self.count += 1
+        self.sum += duration
+        for i, bound in enumerate(buckets):
+            if duration <= bound:
+                self.buckets[i] += 1
+
+
+class MetricsRegistry(object):
+    """
+    Thread-safe registry of API call metrics.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        """
+        Construct metrics registry.
+
+        Args:
+            buckets: Sorted upper bounds of latency histogram buckets in
+                seconds.
+        """
+        self.bucket_bounds = tuple(buckets)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def attach(self, api_client):
+        """
+        Start collecting metrics of calls made by selected client.
+
+        Args:
+            api_client (:obj:`APIClient`): Client to observe.
+        """
+        api_client.add_hook("after", self._after)
+        api_client.add_hook("error", self._error)
+
+    def detach(self, api_client):
+        """
+        Stop collecting metrics of calls made by selected client.
+
+        Args:
+            api_client (:obj:`APIClient`): Observed client.
+        """
+        api_client.remove_hook("after", self._after)
+        api_client.remove_hook("error", self._error)
+
+    def _get_stats(self, method, endpoint):
+        key = (method, _UUID_RE.sub("{uuid}", endpoint))
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = _EndpointStats(self.bucket_bounds)
+        return stats
+
+    def _after(self, method, endpoint, response, duration):
+        body = response.request.body
+        sent = 0 if body is None else len(body)
+        received = _body_size(response)
+        with self._lock:
+            stats = self._get_stats(method, endpoint)
+            status = response.status_code
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.sent += sent
+            if received is not None:
+                stats.received += received
+            stats.observe(self.bucket_bounds, duration)
+
+    def _error(self, method, endpoint, error, duration):
+        name = type(error).__name__
+        with self._lock:
+            stats = self._get_stats(method, endpoint)
+            stats.errors[name] = stats.errors.get(name, 0) + 1
+            if (isinstance(error, exceptions.APIConnectionError) and
+                    getattr(error, "response", None) is None):
+                # Calls that received response were already observed.
+                stats.observe(self.bucket_bounds, duration)
+
+    def clear(self):
+        """
+        Reset all metrics.
+        """
+        with self._lock:
+            self._stats.clear()
+
+    def as_dict(self):
+        """
+        Export metrics as JSON serializable dictionary.
+
+        Returns:
+            Dictionary that maps ``"METHOD endpoint"`` to endpoint metrics.
+        """
+        result = {}
+        with self._lock:
+            for (method, endpoint), stats in self._stats.items():
+                result["{} {}".format(method, endpoint)] = dict(
+                    count=stats.count,
+                    statuses={str(k): v for k, v in stats.statuses.items()},
+                    errors=dict(stats.errors),
+                    duration_sum=stats.sum,
+                    duration_buckets={
+                        str(b): c for b, c in zip(self.bucket_bounds,
+                                                  stats.buckets)
+                    },
+                    bytes_sent=stats.sent,
+                    bytes_received=stats.received,
+                )
+        return result
+
+    def prometheus(self):
+        """
+        Export metrics in Prometheus text exposition format.
+
+        Returns:
+            Metrics as a string.
+        """
+        samples = {name: [] for name in _METRICS}
+
+        def add(name, labels, value, suffix=""):
+            samples[name].append("fco_{}{}{{{}}} {}".format(
+                name, suffix, ",".join(labels), value
+            ))
+
+        with self._lock:
+            for (method, endpoint), stats in sorted(self._stats.items()):
+                labels = ['method="{}"'.format(method),
+                          'endpoint="{}"'.format(endpoint)]
+                for status, count in sorted(stats.statuses.items()):
+                    status_label = 'status="{}"'.format(status)
+                    add("requests_total", labels + [status_label], count)
+                for error, count in sorted(stats.errors.items()):
+                    error_label = 'error="{}"'.format(error)
+                    add("errors_total", labels + [error_label], count)
+
+                name = "request_duration_seconds"
+                for bound, count in zip(self.bucket_bounds, stats.buckets):
+                    bound_label = 'le="{}"'.format(bound)
+                    add(name, labels + [bound_label], count, "_bucket")
+                add(name, labels + ['le="+Inf"'], stats.count, "_bucket")
+                add(name, labels, stats.sum, "_sum")
+                add(name, labels, stats.count, "_count")
+
+                add("request_bytes_total", labels, stats.sent)
+                add("response_bytes_total", labels, stats.received)
+
+        lines = []
+        for name, (kind, text) in sorted(_METRICS.items()):
+            lines.append("# HELP fco_{} {}".format(name, text))
+            lines.append("# TYPE fco_{} {}".format(name, kind))
+            lines.extend(samples[name])
+        return "\n".join(lines) + "\n"
+
+
+_METRICS = dict(
+    requests_total=("counter", "Number of API calls that got response."),
+    errors_total=("counter", "Number of failed API calls."),
+    request_duration_seconds=("histogram", "Duration of API calls."),
+    request_bytes_total=("counter", "Size of request bodies."),
+    response_bytes_total=("counter", "Size of response bodies."),
+)
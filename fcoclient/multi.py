@@ -0,0 +1,249 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module with client that spans multiple FCO installations.
+"""
+
+import inspect
+
+from concurrent import futures
+
+from fcoclient import exceptions
+from fcoclient.client import Client
+from fcoclient.config import Config
+from fcoclient.resources.base import Resource, ResourceType
+
+
+class MultiClient(object):
+    """
+    Client that fans out requests to several FCO installations.
+
+    Resource clients of the multi client have the same names as the ones on
+    :obj:`Client` (``server``, ``disk``, ...). Read operations (``list``,
+    ``get`` and ``count``) are sent to all backends concurrently and all
+    resources that are returned have an ``origin`` attribute set to the name
+    of the backend that they came from. All other operations are sent to a
+    single backend, selected by the origin of the resource that is passed as
+    a first argument or by an explicit ``origin`` keyword argument. Resource
+    is replaced by its UUID only if the method expects UUID (``start``,
+    ``delete``, ...), skeletons are passed to ``create`` unchanged.
+    """
+
+    def __init__(self, clients, max_workers=None):
+        """
+        Construct multi client.
+
+        Args:
+            clients (dict): Mapping from backend name to :obj:`Client`.
+            max_workers (int): Maximum number of concurrent requests
+                (default: four times the number of backends).
+        """
+        if len(clients) == 0:
+            raise exceptions.FCOError("At least one backend is required")
+
+        self.clients = dict(clients)
+        if max_workers is None:
+            max_workers = 4 * len(self.clients)
+        self._executor = futures.ThreadPoolExecutor(max_workers)
+
+        for resource_type in ResourceType:
+            if resource_type != ResourceType.any:
+                setattr(self, resource_type.name,
+                        MultiResourceClient(self, resource_type.name))
+
+    @staticmethod
+    def from_config_files(paths, max_workers=None):
+        """
+        Construct multi client from configuration files.
+
+        Args:
+            paths (dict): Mapping from backend name to configuration file.
+            max_workers (int): Maximum number of concurrent requests.
+
+        Returns:
+            :obj:`MultiClient`: New multi client.
+
+        Raises:
+            InvalidConfigError: If any of the configuration files is broken.
+        """
+        clients = {name: Client(**Config.load_from_file(path))
+                   for name, path in paths.items()}
+        return MultiClient(clients, max_workers)
+
+    def close(self):
+        """
+        Stop worker threads and release network connections of backends.
+        """
+        self._executor.shutdown()
+        for client in self.clients.values():
+            client.close()
+
+    def map(self, func):
+        """
+        Call function for each backend concurrently.
+
+        Args:
+            func: Callable that takes backend name and :obj:`Client`.
+
+        Returns:
+            Dictionary mapping backend name to function result.
+
+        Raises:
+            Exception: First exception that was raised by any of the calls.
+        """
+        fs = {name: self._executor.submit(func, name, client)
+              for name, client in self.clients.items()}
+        return {name: f.result() for name, f in fs.items()}
+
+
+class MultiResourceClient(object):
+    """
+    Resource client that spans all backends of a :obj:`MultiClient`.
+    """
+
+    def __init__(self, multi, name):
+        """
+        Construct resource client.
+
+        Args:
+            multi (:obj:`MultiClient`): Parent multi client.
+            name (str): Name of the resource client on :obj:`Client`.
+        """
+        self.multi = multi
+        self.name = name
+
+    def on(self, origin):
+        """
+        Get resource client of selected backend.
+
+        Args:
+            origin (str): Backend name.
+
+        Returns:
+            Resource client of the backend.
+
+        Raises:
+            FCOError: If there is no such backend.
+        """
+        try:
+            return getattr(self.multi.clients[origin], self.name)
+        except KeyError:
+            raise exceptions.FCOError("Unknown backend: {}".format(origin))
+
+    def list(self, no_items=200, **conditions):
+        """
+        List items that match conditions on all backends.
+
+        Args:
+            no_items (int): Maximum number of items to return per backend.
+            **conditions: Conditions that are used to filter the resources.
+
+        Returns:
+            List of resources from all backends, grouped by backend name.
+        """
+        results = self.multi.map(
+            lambda name, client: self._tag(
+                name, getattr(client, self.name).list(no_items, **conditions)
+            )
+        )
+        return [r for name in sorted(results) for r in results[name]]
+
+    def get(self, **conditions):
+        """
+        Retrieve single resource that matches conditions on any backend.
+
+        Args:
+            **conditions: Conditions that are used to filter the resources.
+
+        Returns:
+            Resource that matches conditions.
+
+        Raises:
+            NonUniqueResourceError: If more than one resource matches.
+            NoSuchResourceError: If no resource matches conditions.
+        """
+        def _get(name, client):
+            try:
+                item = getattr(client, self.name).get(**conditions)
+            except exceptions.NoSuchResourceError:
+                return None
+            return self._tag(name, [item])[0]
+
+        items = [i for i in self.multi.map(_get).values() if i is not None]
+        if len(items) > 1:
+            raise exceptions.NonUniqueResourceError(conditions)
+        elif len(items) < 1:
+            raise exceptions.NoSuchResourceError(conditions)
+        return items[0]
+
+    def count(self, **conditions):
+        """
+        Count items that match conditions on all backends.
+
+        Args:
+            **conditions: Conditions that are used to filter the resources.
+
+        Returns:
+            Dictionary mapping backend name to number of matching resources.
+        """
+        return self.multi.map(
+            lambda _, client: getattr(client, self.name).count(**conditions)
+        )
+
+    def __getattr__(self, method):
+        if method.startswith("_"):
+            raise AttributeError(method)
+
+        def _call(*args, **kwargs):
+            args = list(args)
+            origin = kwargs.pop("origin", None)
+            tagged = len(args) > 0 and hasattr(args[0], "origin")
+            if tagged:
+                origin = origin or args[0].origin
+            if origin is None:
+                msg = "Cannot route '{}.{}' without origin"
+                raise exceptions.FCOError(msg.format(self.name, method))
+
+            func = getattr(self.on(origin), method)
+            if tagged and _takes_uuid(func):
+                args[0] = args[0].uuid
+            result = func(*args, **kwargs)
+            if isinstance(result, Resource):
+                self._tag(origin, [result])
+            elif isinstance(result, list):
+                self._tag(origin, [r for r in result
+                                   if isinstance(r, Resource)])
+            return result
+        return _call
+
+    @staticmethod
+    def _tag(origin, resources):
+        for resource in resources:
+            resource.origin = origin
+        return resources
+
+
+def _takes_uuid(method):
+    """
+    Check whether first argument of client method is resource UUID.
+    """
+    func = getattr(method, "__func__", method)
+    func = getattr(func, "__wrapped__", func)
+    try:
+        args = inspect.getfullargspec(func).args
+    except AttributeError:  # Python 2
+        args = inspect.getargspec(func).args
+    return len(args) > 1 and args[1] in ("uuid", "item_uuid", "resource_uuid")
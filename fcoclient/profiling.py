@@ -0,0 +1,109 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module with timing breakdown of client's work.
+
+When profiler is installed, each API call records time spent in separate
+phases:
+
+  * ``throttle`` - waiting for rate limiter,
+  * ``wait`` - from sending request until response headers arrive (this
+    includes establishing new connections and server processing time),
+  * ``download`` - reading response body,
+  * ``decode`` - parsing JSON.
+
+Time spent sleeping in :func:`fcoclient.utils.delay` is recorded as
+``delay`` phase.
+"""
+
+from __future__ import print_function
+
+import threading
+import time
+
+profiler = None
+"""Currently installed :obj:`Profiler` or ``None``."""
+
+
+class Profiler(object):
+    """
+    Thread-safe collector of phase timings.
+    """
+
+    def __init__(self):
+        self.start = time.time()
+        self._phases = {}
+        self._lock = threading.Lock()
+
+    def add(self, phase, duration):
+        """
+        Record single measurement.
+
+        Args:
+            phase (str): Name of the phase.
+            duration (float): Duration in seconds.
+        """
+        with self._lock:
+            count, total, top = self._phases.get(phase, (0, 0.0, 0.0))
+            self._phases[phase] = (count + 1, total + duration,
+                                   max(top, duration))
+
+    @property
+    def phases(self):
+        """
+        Dictionary that maps phase name to ``(count, total, max)`` tuple.
+        """
+        with self._lock:
+            return dict(self._phases)
+
+    def summary(self, file):
+        """
+        Print summary table.
+
+        Args:
+            file: File like object that receives the table.
+        """
+        total = time.time() - self.start
+        row = "{:<10} {:>7} {:>11} {:>10} {:>10}"
+        print(row.format("phase", "calls", "total [ms]", "mean [ms]",
+                         "max [ms]"), file=file)
+        for phase, (count, spent, top) in sorted(self.phases.items()):
+            print(row.format(
+                phase, count, "{:.1f}".format(spent * 1000),
+                "{:.1f}".format(spent * 1000 / count),
+                "{:.1f}".format(top * 1000)
+            ), file=file)
+        print("Wall clock time: {:.1f} ms".format(total * 1000), file=file)
+
+
+def install():
+    """
+    Install new profiler.
+
+    Returns:
+        :obj:`Profiler`: Installed profiler.
+    """
+    global profiler
+    profiler = Profiler()
+    return profiler
+
+
+def uninstall():
+    """
+    Remove installed profiler.
+    """
+    global profiler
+    profiler = None
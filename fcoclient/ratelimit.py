@@ -0,0 +1,363 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module with client-side rate limiting.
+
+Rate limiter keeps request rate and number of concurrent requests under the
+limits that FCO API enforces. Limits can be shared between threads of a
+single process or, using lock files, between multiple processes on the same
+host.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from fcoclient.exceptions import FCOError
+
+
+class TokenBucket(object):
+    """
+    Thread-safe token bucket.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        Construct token bucket.
+
+        Args:
+            rate (float): Number of tokens added to the bucket per second.
+            burst (float): Capacity of the bucket (default: ``rate``, but at
+                least one token).
+
+        Raises:
+            FCOError: If rate is not positive.
+        """
+        if isinstance(rate, bool) or rate <= 0:
+            msg = "Rate limit must be positive, got {}"
+            raise FCOError(msg.format(rate))
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.burst
+        self._time = time.time()
+        self._lock = threading.Lock()
+
+    def reserve(self, blocking=True):
+        """
+        Reserve single token.
+
+        Args:
+            blocking (bool): If False, token is only reserved if it is
+                available right away.
+
+        Returns:
+            Number of seconds that caller needs to wait before the reserved
+            token becomes valid or ``None`` if token was not reserved.
+        """
+        with self._lock:
+            tokens, last, delay = self._take(self._tokens, self._time)
+            if delay > 0 and not blocking:
+                return None
+            self._tokens, self._time = tokens, last
+        return delay
+
+    def _take(self, tokens, last):
+        now = time.time()
+        tokens = min(self.burst, tokens + (now - last) * self.rate) - 1
+        delay = 0.0 if tokens >= 0 else -tokens / self.rate
+        return tokens, now, delay
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket that stores its state in a file.
+
+    All processes that use the same file share the same bucket. Access to the
+    file is serialized using ``flock``.
+    """
+
+    def __init__(self, path, rate, burst=None):
+        """
+        Construct shared token bucket.
+
+        Args:
+            path (str): Path to the file that holds bucket state.
+            rate (float): Number of tokens added to the bucket per second.
+            burst (float): Capacity of the bucket.
+        """
+        super(SharedTokenBucket, self).__init__(rate, burst)
+        self.path = path
+
+    def reserve(self, blocking=True):
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                with os.fdopen(os.dup(fd), "r+") as f:
+                    try:
+                        state = json.load(f)
+                        tokens, last = state["tokens"], state["time"]
+                    except (ValueError, KeyError):
+                        tokens, last = self.burst, time.time()
+                    tokens, last, delay = self._take(tokens, last)
+                    if delay > 0 and not blocking:
+                        return None
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(dict(tokens=tokens, time=last), f)
+            finally:
+                os.close(fd)
+        return delay
+
+
+class Semaphore(object):
+    """
+    Thread-safe semaphore with handle-based interface.
+    """
+
+    def __init__(self, value):
+        self._semaphore = threading.BoundedSemaphore(value)
+
+    def acquire(self, blocking=True):
+        return True if self._semaphore.acquire(blocking) else None
+
+    def release(self, _handle):
+        self._semaphore.release()
+
+
+class SharedSemaphore(object):
+    """
+    Semaphore that is shared between processes.
+
+    Each slot of the semaphore is represented by a lock file. Acquiring the
+    semaphore means obtaining exclusive ``flock`` on any of the slot files.
+    """
+
+    poll_interval = 0.01
+
+    def __init__(self, path, value):
+        """
+        Construct shared semaphore.
+
+        Args:
+            path (str): Prefix of the slot lock files.
+            value (int): Number of slots.
+        """
+        self.paths = ["{}.{}".format(path, i) for i in range(value)]
+
+    def acquire(self, blocking=True):
+        """
+        Acquire a slot, blocking until one becomes available.
+
+        Args:
+            blocking (bool): If False, return immediately when all slots
+                are taken.
+
+        Returns:
+            Handle that must be passed to :meth:`release` or ``None`` if
+            slot was not acquired.
+        """
+        while True:
+            for path in self.paths:
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except (IOError, OSError):
+                    os.close(fd)
+            if not blocking:
+                return None
+            time.sleep(self.poll_interval)
+
+    def release(self, handle):
+        os.close(handle)
+
+
+class RateLimiter(object):
+    """
+    Rate limiter for FCO API calls.
+
+    Calls are divided into three categories: ``read`` (GET requests),
+    ``list`` (resource listings) and ``mutate`` (all other requests). Each
+    category can have its own limits. Categories without overrides share
+    default limits.
+    """
+
+    categories = ("read", "list", "mutate")
+
+    def __init__(self, rate=None, burst=None, max_concurrent=None,
+                 overrides=None, lock_file=None):
+        """
+        Construct rate limiter.
+
+        Args:
+            rate (float): Maximum number of requests per second. ``None``
+                disables rate limiting.
+            burst (float): Number of requests that can be issued at once
+                after limiter has been idle (default: ``rate``).
+            max_concurrent (int): Maximum number of requests in flight.
+                ``None`` disables concurrency limit.
+            overrides (dict): Mapping from category name to dictionary with
+                ``rate``, ``burst`` and ``max_concurrent`` keys that replace
+                default limits for selected category.
+            lock_file (str): If set, limits are shared between all processes
+                that use the same lock file. Actual state is stored in files
+                that have ``lock_file`` as a prefix.
+
+        Raises:
+            FCOError: If limits are shared and platform does not support
+                file locking or if limits are not positive.
+        """
+        if lock_file is not None and fcntl is None:
+            raise FCOError("Shared rate limits require fcntl support")
+
+        self.lock_file = lock_file
+        overrides = overrides or {}
+        invalid = set(overrides.keys()) - set(self.categories)
+        if len(invalid) > 0:
+            msg = "Invalid rate limit categories: {}"
+            raise FCOError(msg.format(", ".join(sorted(invalid))))
+
+        default = self._create_limits("default", rate, burst, max_concurrent)
+        self._limits = {}
+        for category in self.categories:
+            if category in overrides:
+                self._limits[category] = self._create_limits(
+                    category, **overrides[category]
+                )
+            else:
+                self._limits[category] = default
+
+    @staticmethod
+    def from_config(config):
+        """
+        Create rate limiter from configuration.
+
+        Configuration can be a number (requests per second) or a dictionary
+        with ``rate``, ``burst``, ``max_concurrent`` and ``lock_file`` keys.
+        Category overrides are stored under category names, for example
+        ``{"rate": 10, "list": {"rate": 2, "max_concurrent": 1}}``.
+
+        Args:
+            config: Rate limiter configuration or :obj:`RateLimiter`.
+
+        Returns:
+            :obj:`RateLimiter`: Configured rate limiter.
+
+        Raises:
+            FCOError: If configuration is not valid.
+        """
+        if isinstance(config, RateLimiter):
+            return config
+        if isinstance(config, bool):
+            raise FCOError("Invalid rate limit config: {}".format(config))
+        if isinstance(config, (int, float)):
+            return RateLimiter(rate=config)
+
+        config = dict(config)
+        overrides = {c: config.pop(c) for c in RateLimiter.categories
+                     if c in config}
+        return RateLimiter(overrides=overrides, **config)
+
+    @staticmethod
+    def categorize(method, endpoint):
+        """
+        Determine category of the API call.
+
+        Args:
+            method (str): HTTP method.
+            endpoint (str): Relative resource path.
+
+        Returns:
+            Name of the category.
+        """
+        if endpoint.endswith("/list"):
+            return "list"
+        if method == "GET":
+            return "read"
+        return "mutate"
+
+    @contextlib.contextmanager
+    def limit(self, method, endpoint, blocking=True):
+        """
+        Context manager that wraps single API call.
+
+        Entering the context blocks until call is allowed by the limits of
+        its category. Context value tells whether call is allowed.
+
+        Args:
+            method (str): HTTP method.
+            endpoint (str): Relative resource path.
+            blocking (bool): If False, call is not allowed unless limits
+                allow it right away.
+        """
+        bucket, semaphore = self._limits[self.categorize(method, endpoint)]
+        handle = None
+        if not blocking and semaphore is not None:
+            # Slot is checked first, so refused calls do not waste tokens.
+            handle = semaphore.acquire(False)
+            if handle is None:
+                yield False
+                return
+
+        if bucket is not None:
+            delay = bucket.reserve(blocking)
+            if delay is None:
+                if semaphore is not None:
+                    semaphore.release(handle)
+                yield False
+                return
+            if delay > 0:
+                time.sleep(delay)
+
+        if blocking and semaphore is not None:
+            handle = semaphore.acquire()
+        try:
+            yield True
+        finally:
+            if semaphore is not None:
+                semaphore.release(handle)
+
+    def _create_limits(self, name, rate=None, burst=None,
+                       max_concurrent=None):
+        if max_concurrent is not None and (
+                isinstance(max_concurrent, bool) or max_concurrent <= 0):
+            msg = "Concurrency limit must be positive, got {}"
+            raise FCOError(msg.format(max_concurrent))
+
+        bucket = semaphore = None
+        path = None
+        if self.lock_file is not None:
+            path = "{}.{}".format(self.lock_file, name)
+
+        if rate is not None:
+            if path is None:
+                bucket = TokenBucket(rate, burst)
+            else:
+                bucket = SharedTokenBucket(path, rate, burst)
+        if max_concurrent is not None:
+            if path is None:
+                semaphore = Semaphore(max_concurrent)
+            else:
+                semaphore = SharedSemaphore(path + ".slot", max_concurrent)
+        return bucket, semaphore
@@ -20,10 +20,12 @@ Classes in this module serve as a base for all other resources and clients.
 """
 
 import enum
+import importlib
+import threading
+import weakref
 
-from requests import codes
-
-from fcoclient import exceptions, utils
+from fcoclient import exceptions, tracing, utils
+from fcoclient.utils import codes
 
 
 @enum.unique
@@ -45,12 +47,145 @@ class ResourceType(enum.Enum):
     vdc = "VDC"
 
 
+class Relation(object):
+    """
+    Reference from resource to resources of another type.
+
+    Relation is described by the type of referenced resources and a path of
+    field names that leads to referenced UUIDs. Lists that are encountered
+    along the path are traversed element by element, which means that path
+    ``("nics", "networkUUID")`` collects network UUIDs of all server NICs.
+    Referenced resources are retrieved using client that :func:`client_for`
+    constructs for the relation's resource type.
+    """
+
+    def __init__(self, resource_type, *path, **kwargs):
+        """
+        Construct relation.
+
+        Args:
+            resource_type (:obj:`ResourceType`): Type of referenced
+                resources.
+            *path: Field names that lead to referenced UUIDs.
+            many (bool): If True, relation resolves to a list of resources,
+                otherwise to a single resource or ``None``.
+        """
+        self.resource_type = resource_type
+        self.path = path
+        self.many = kwargs.pop("many", False)
+
+    def uuids(self, resource):
+        """
+        Collect UUIDs that resource references.
+        """
+        values = [resource]
+        for field in self.path:
+            found = []
+            for value in values:
+                value = value.get(field) if isinstance(value, dict) else None
+                if isinstance(value, list):
+                    found.extend(value)
+                elif value is not None:
+                    found.append(value)
+            values = found
+        return values
+
+    def resolve(self, resource, resources):
+        """
+        Find referenced resources.
+
+        Args:
+            resource (:obj:`Resource`): Resource that holds references.
+            resources: Dictionary that maps UUIDs to retrieved resources.
+
+        Returns:
+            List of referenced resources if relation references many
+            resources, single resource or ``None`` otherwise. References to
+            resources that could not be retrieved are skipped.
+        """
+        found = [resources[u] for u in self.uuids(resource) if u in resources]
+        if self.many:
+            return found
+        return found[0] if found else None
+
+
+CLIENT_CLASSES = {
+    ResourceType.disk: "DiskClient",
+    ResourceType.firewalltemplate: "FirewallTemplateClient",
+    ResourceType.image: "ImageClient",
+    ResourceType.job: "JobClient",
+    ResourceType.nic: "NicClient",
+    ResourceType.network: "NetworkClient",
+    ResourceType.productoffer: "ProductOfferClient",
+    ResourceType.server: "ServerClient",
+    ResourceType.sshkey: "SshKeyClient",
+    ResourceType.vdc: "VdcClient",
+}
+"""Names of resource client classes. Each class lives in module
+``fcoclient.resources.<type name>``, which is imported on first use."""
+
+_clients = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def client_for(resource_type, api_client):
+    """
+    Get client for resources of selected type.
+
+    This is how :obj:`Client` and prefetching of related resources
+    (``include``) find clients. Clients are stateless, so a single client
+    per type is constructed for each http client and reused.
+
+    Args:
+        resource_type (:obj:`ResourceType`): Type of resources.
+        api_client (:obj:`APIClient`): Http client that client uses.
+
+    Returns:
+        :obj:`BaseClient`: Resource client.
+
+    Raises:
+        FCOError: If there is no client for resource type.
+    """
+    with _clients_lock:
+        clients = _clients.setdefault(api_client, {})
+        client = clients.get(resource_type)
+    if client is not None:
+        return client
+
+    class_name = CLIENT_CLASSES.get(resource_type)
+    if class_name is None:
+        msg = "No client for {}".format(resource_type.name)
+        raise exceptions.FCOError(msg)
+    module = importlib.import_module(
+        "fcoclient.resources." + resource_type.name
+    )
+    client = getattr(module, class_name)(api_client)
+    with _clients_lock:
+        return clients.setdefault(resource_type, client)
+
+
 class Resource(dict):
     """
     Resource is simple data container with few additional helpers.
     """
 
     resource_type = ResourceType.any
+    relations = {}
+    """dict: Relations that can be included when retrieving resources."""
+
+    @property
+    def related(self):
+        """
+        Related resources that were included when resource was retrieved.
+        """
+        return self.__dict__.setdefault("_related", {})
+
+    @property
+    def settled(self):
+        """
+        False if resource is in the middle of state change.
+        """
+        return True
 
     @property
     def uuid(self):
@@ -90,24 +225,42 @@ class BaseClient(object):
 
     _prefix = "resources"
     klass = None
+    cacheable = True
+    parent = None
+    """str: Relation to resource that embeds these resources, if any."""
+    poll_interval = 5
+    """float: Number of seconds between polls when waiting for changes."""
 
     @staticmethod
     def _get_filter(conditions):
         """
         Construct a filter expression for FCO API.
+
+        Conditions with list, tuple or set values match resources where the
+        field is equal to any of the values.
         """
-        conds = [{"field": k, "value": [v], "condition": "IS_EQUAL_TO"}
+        conds = [{"field": k, "value": BaseClient._get_values(v),
+                  "condition": "IS_EQUAL_TO"}
                  for k, v in conditions.items()]
         return {"filterConditions": conds}
 
     @staticmethod
-    def _get_query_limit(no_items):
+    def _get_values(value):
+        """
+        Convert condition value into a list of values for FCO API.
+        """
+        if isinstance(value, (list, tuple, set, frozenset)):
+            return list(value)
+        return [value]
+
+    @staticmethod
+    def _get_query_limit(no_items, start=0):
         """
         Construct query limit expression for FCO API.
         """
         return {
-            "from": 0,
-            "to": no_items,
+            "from": start,
+            "to": start + no_items,
             "maxRecords": no_items,
             "loadChildren": True,
             "orderBy": [{
@@ -126,7 +279,8 @@ class BaseClient(object):
         self.endpoint = "{}/{}".format(self._prefix,
                                        self.klass.resource_type.value)
 
-    def list(self, no_items=200, **conditions):
+    @tracing.traced
+    def list(self, no_items=200, include=None, **conditions):
         """
         List items that match conditions.
 
@@ -136,19 +290,136 @@ class BaseClient(object):
 
         Args:
             no_items (int): Maximum number of items to return.
+            include: Names of relations (see :attr:`Resource.relations`)
+                whose resources are retrieved and stored in
+                :attr:`Resource.related`. Each type of related resources is
+                retrieved using a single request per 100 referenced UUIDs.
             **conditions: Conditions that are used to filter the resources.
 
         Returns:
             List of resources that match conditions.
         """
+        return self._include(self._list_page(0, no_items, conditions),
+                             include)
+
+    def iterate(self, page_size=100, stream=False, include=None,
+                **conditions):
+        """
+        Iterate over all items that match conditions.
+
+        Unlike :meth:`list`, this method is not limited to a single response
+        from FCO API. Items are retrieved page by page and yielded as soon as
+        each page arrives.
+
+        In streaming mode, items are decoded from response while it is being
+        downloaded and yielded one by one, which means that memory usage does
+        not grow with page size. Response stays open until all of its items
+        are consumed, so do not make other calls on the same thread while
+        iterating if connection reuse matters.
+
+        Args:
+            page_size (int): Number of items to retrieve in single request.
+            stream (bool): Decode items incrementally.
+            include: Names of relations whose resources should be included.
+                Relations are resolved page by page and cannot be combined
+                with streaming.
+            **conditions: Conditions that are used to filter the resources.
+
+        Yields:
+            Resources that match conditions.
+        """
+        if not stream:
+            for page in self.pages(page_size, include=include, **conditions):
+                for item in page:
+                    yield item
+            return
+
+        if include:
+            raise exceptions.FCOError(
+                "Related resources cannot be included when streaming"
+            )
+        start = 0
+        while True:
+            count = 0
+            for item in self._stream_page(start, page_size, conditions):
+                count += 1
+                yield item
+            if count < page_size:
+                break
+            start += page_size
+
+    def pages(self, page_size=100, no_items=None, include=None, **conditions):
+        """
+        Iterate over pages of items that match conditions.
+
+        Args:
+            page_size (int): Number of items to retrieve in single request.
+            no_items (int): Maximum number of items to return. If ``None``,
+                all matching items are returned.
+            include: Names of relations whose resources should be included.
+            **conditions: Conditions that are used to filter the resources.
+
+        Yields:
+            Lists of resources that match conditions, one list per request.
+        """
+        start = 0
+        while no_items is None or start < no_items:
+            size = page_size
+            if no_items is not None:
+                size = min(page_size, no_items - start)
+            page = self._list_page(start, size, conditions)
+            if len(page) > 0:
+                yield self._include(page, include)
+            if len(page) < size:
+                break
+            start += size
+
+    @tracing.traced
+    def count(self, **conditions):
+        """
+        Count items that match conditions.
+
+        Args:
+            **conditions: Conditions that are used to filter the resources.
+
+        Returns:
+            Number of resources that match conditions.
+        """
+        return self._query_list(0, 1, conditions)["totalCount"]
+
+    def _list_page(self, start, no_items, conditions):
+        resources = self._query_list(start, no_items, conditions)["list"]
+        resources = [self.klass(**r) for r in resources]
+        cache = self._cache
+        if cache is not None:
+            for resource in resources:
+                cache.put(resource)
+        return resources
+
+    def _stream_page(self, start, no_items, conditions):
+        cache = self._cache
+        items = self.client.post_stream(
+            self.endpoint + "/list",
+            self._list_query(start, no_items, conditions), codes.ok, "list"
+        )
+        for item in items:
+            resource = self.klass(**item)
+            if cache is not None:
+                cache.put(resource)
+            yield resource
+
+    def _query_list(self, start, no_items, conditions):
         endpoint = self.endpoint + "/list"
+        data = self._list_query(start, no_items, conditions)
+        return self.client.post(endpoint, data, codes.ok)
+
+    def _list_query(self, start, no_items, conditions):
         conditions = Resource.normalize(conditions)
-        data = dict(searchFilter=self._get_filter(conditions),
-                    queryLimit=self._get_query_limit(no_items))
-        resources = self.client.post(endpoint, data, codes.ok)["list"]
-        return [self.klass(**r) for r in resources]
+        return dict(searchFilter=self._get_filter(conditions),
+                    queryLimit=self._get_query_limit(no_items, start))
 
-    def get(self, **conditions):
+    @tracing.traced
+    def get(self, include=None, **conditions):
         """
         Retrieve single resource that matches conditions.
 
@@ -157,6 +428,7 @@ class BaseClient(object):
         uniquely, exception is raised.
 
         Args:
+            include: Names of relations whose resources should be included.
             **conditions: Conditions that are used to filter the resources.
 
         Returns:
@@ -166,6 +438,22 @@ class BaseClient(object):
             NonUniqueResourceError: If more than one resource matches.
             NoSuchResourceError: If no resource matches conditions.
         """
+        return self._include([self._get(conditions, cached=True)],
+                             include)[0]
+
+    def _get(self, conditions, cached):
+        cache = self._cache
+        if cached and cache is not None and list(conditions) == ["uuid"]:
+            item = cache.get(self.klass.resource_type, conditions["uuid"])
+            if item is not None:
+                return item
+
+        coalescing = self.client.coalescing
+        if coalescing is not None and list(conditions) == ["uuid"]:
+            uuid = conditions["uuid"]
+            if not isinstance(uuid, (list, tuple, set, frozenset)):
+                return coalescing.get(self, uuid)
+
         data = self.list(**conditions)
         if len(data) > 1:
             raise exceptions.NonUniqueResourceError(conditions)
@@ -173,6 +461,47 @@ class BaseClient(object):
             raise exceptions.NoSuchResourceError(conditions)
         return data[0]
 
+    def _include(self, resources, include):
+        """
+        Retrieve related resources and attach them to resources.
+
+        UUIDs are collected across all resources and each type of related
+        resources is retrieved in batches by the client from
+        :func:`client_for`, no matter how many resources reference it.
+        """
+        if not include:
+            return resources
+
+        relations = {}
+        for name in include:
+            if name not in self.klass.relations:
+                msg = "{} has no relation {} (valid relations: {})"
+                raise exceptions.FCOError(msg.format(
+                    self.klass.resource_type.name, name,
+                    ", ".join(sorted(self.klass.relations)),
+                ))
+            relations[name] = self.klass.relations[name]
+
+        uuids = {}
+        for relation in relations.values():
+            wanted = uuids.setdefault(relation.resource_type, set())
+            for resource in resources:
+                wanted.update(relation.uuids(resource))
+
+        found = {}
+        for resource_type, wanted in uuids.items():
+            client = client_for(resource_type, self.client)
+            wanted = sorted(wanted)
+            for start in range(0, len(wanted), 100):
+                batch = wanted[start:start + 100]
+                found.update((r.uuid, r)
+                             for r in client.list(len(batch), uuid=batch))
+
+        for resource in resources:
+            for name, relation in relations.items():
+                resource.related[name] = relation.resolve(resource, found)
+        return resources
+
     def skeleton(self):
         """
         Produce resource skeleton object.
@@ -189,6 +518,7 @@ class BaseClient(object):
         """
         return self.klass.skeleton()
 
+    @tracing.traced
     def delete(self, resource_uuid, cascade=False):
         """
         Schedule deletion of selected resource.
@@ -208,8 +538,10 @@ class BaseClient(object):
         """
         endpoint = "{}/{}".format(self.endpoint, resource_uuid)
         data = dict(cascade=cascade)
+        self._invalidate(resource_uuid)
         return Job(self.client.delete(endpoint, data, codes.accepted))
 
+    @tracing.traced
     def wait_for_condition(self, item_uuid, condition):
         """
         Waits until item satisfies condition.
@@ -224,12 +556,47 @@ class BaseClient(object):
         """
         # TODO: There should probably be some sort of timeout in place here in
         # order to prevent infinite waiting.
-        item = self.get(uuid=item_uuid)
+        item = self._get(dict(uuid=item_uuid), cached=False)
         while not condition(item):
-            utils.delay()
-            item = self.get(uuid=item.uuid)
+            utils.delay(self.poll_interval)
+            item = self._get(dict(uuid=item.uuid), cached=False)
         return item
 
+    @property
+    def _cache(self):
+        return self.client.cache if self.cacheable else None
+
+    def _invalidate(self, uuid):
+        """
+        Remove resource from cache because it is about to change.
+
+        Resources that embed the changed resource are removed as well.
+        """
+        cache = self._cache
+        if cache is None:
+            return
+        resource_type = self.klass.resource_type
+        if self.parent is not None:
+            cached = cache.get(resource_type, uuid)
+            if cached is None:
+                # Any cached parent might embed the resource.
+                relation = self.klass.relations[self.parent]
+                cache.discard_type(relation.resource_type)
+            else:
+                self._invalidate_parent(cached)
+        cache.discard(resource_type, uuid)
+
+    def _invalidate_parent(self, resource):
+        """
+        Remove resource that embeds selected resource from cache.
+        """
+        cache = self._cache
+        if cache is None or self.parent is None:
+            return
+        relation = self.klass.relations[self.parent]
+        for uuid in relation.uuids(resource):
+            cache.discard(relation.resource_type, uuid)
+
 
 @enum.unique
 class JobStatus(enum.Enum):
@@ -17,10 +17,12 @@
 Module with disk related functionality.
 """
 
-from requests import codes
-
-from fcoclient.resources.base import BaseClient, Resource, ResourceType
+from fcoclient import tracing
+from fcoclient.resources.base import (
+    BaseClient, Relation, Resource, ResourceType
+)
 from fcoclient.resources.job import Job
+from fcoclient.utils import codes
 
 
 class Disk(Resource):
@@ -29,6 +31,11 @@ class Disk(Resource):
     """
 
     resource_type = ResourceType.disk
+    relations = dict(
+        productoffer=Relation(ResourceType.productoffer, "productOfferUUID"),
+        server=Relation(ResourceType.server, "serverUUID"),
+        vdc=Relation(ResourceType.vdc, "vdcUUID"),
+    )
 
     @staticmethod
     def skeleton():
@@ -72,7 +79,9 @@ class DiskClient(BaseClient):
     """
 
     klass = Disk
+    parent = "server"
 
+    @tracing.traced
     def create(self, skeleton):
         """
         Create new disk.
@@ -87,4 +96,5 @@ class DiskClient(BaseClient):
            :obj:`Job`: New job, describing creation progress.
         """
         data = {"skeletonDisk": skeleton}
+        self._invalidate_parent(skeleton)
         return Job(self.client.post(self.endpoint, data, codes.accepted))
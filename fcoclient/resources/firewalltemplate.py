@@ -17,10 +17,10 @@
 Module with firewall templates related functionality.
 """
 
-from requests import codes
-
+from fcoclient import tracing
 from fcoclient.resources.base import BaseClient, Resource, ResourceType
 from fcoclient.resources.job import Job
+from fcoclient.utils import codes
 
 
 class FirewallTemplate(Resource):
@@ -73,6 +73,7 @@ class FirewallTemplateClient(BaseClient):
 
     klass = FirewallTemplate
 
+    @tracing.traced
     def create(self, skeleton):
         """
         Create new firewall template.
@@ -89,6 +90,7 @@ class FirewallTemplateClient(BaseClient):
         data = dict(skeletonFirewallTemplate=skeleton)
         return Job(self.client.post(self.endpoint, data, codes.accepted))
 
+    @tracing.traced
     def apply(self, uuid, address):
         """
         Apply firewall template to selected address.
@@ -102,4 +104,5 @@ class FirewallTemplateClient(BaseClient):
         """
         data = dict(ipAddress=address)
         endpoint = "{}/{}/apply".format(self.endpoint, uuid)
+        self._invalidate(uuid)
         return Job(self.client.put(endpoint, data, codes.accepted))
@@ -17,7 +17,9 @@
 Module with image related functionality.
 """
 
-from fcoclient.resources.base import BaseClient, Resource, ResourceType
+from fcoclient.resources.base import (
+    BaseClient, Relation, Resource, ResourceType
+)
 
 
 class Image(Resource):
@@ -26,6 +28,9 @@ class Image(Resource):
     """
 
     resource_type = ResourceType.image
+    relations = dict(
+        vdc=Relation(ResourceType.vdc, "vdcUUID"),
+    )
 
 
 class ImageClient(BaseClient):
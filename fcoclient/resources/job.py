@@ -17,10 +17,19 @@
 Module with job related functionality.
 """
 
-from requests import codes
+import logging
+import threading
+import time
 
-from fcoclient.resources.base import JobStatus  # noqa
-from fcoclient.resources.base import BaseClient, Job
+from concurrent import futures
+
+from fcoclient import exceptions, tracing, utils
+from fcoclient.resources.base import (
+    BaseClient, Job, JobStatus, ResourceType, client_for
+)
+from fcoclient.utils import codes
+
+logger = logging.getLogger(__name__)
 
 
 class JobClient(BaseClient):
@@ -31,7 +40,11 @@ class JobClient(BaseClient):
     """
 
     klass = Job
+    cacheable = False
+    poller = None
+    """:obj:`JobPoller`: If set, waiting is delegated to shared poller."""
 
+    @tracing.traced
     def wait(self, uuid):
         """
         Wait for job to terminate.
@@ -42,8 +55,63 @@ class JobClient(BaseClient):
         Args:
             uuid: Job to wait for
         """
-        return self.wait_for_condition(uuid, lambda x: x.status.is_terminal)
+        if self.poller is not None:
+            return self.poller.wait(uuid)
+        job = self.wait_for_condition(uuid, lambda x: x.status.is_terminal)
+        self._settle(job)
+        return job
+
+    @tracing.traced
+    def wait_all(self, uuids):
+        """
+        Wait for all selected jobs to terminate.
+
+        Instead of polling each job separately, all pending jobs are
+        retrieved using single list request per polling round.
+
+        Note that this function does not check if jobs terminated in error.
+        This is responsibility of the caller.
+
+        Args:
+            uuids: UUIDs of the jobs to wait for
+
+        Returns:
+            List of terminated jobs, in the same order as ``uuids``.
+
+        Raises:
+            NoSuchResourceError: If any of the jobs does not exist.
+        """
+        pending = set(uuids)
+        done = {}
+        while len(pending) > 0:
+            jobs = self.list(len(pending), uuid=sorted(pending))
+            missing = pending - set(job.uuid for job in jobs)
+            if len(missing) > 0:
+                conditions = dict(uuid=sorted(missing))
+                raise exceptions.NoSuchResourceError(conditions)
+            for job in jobs:
+                if job.status.is_terminal:
+                    self._settle(job)
+                    done[job.uuid] = job
+                    pending.discard(job.uuid)
+            if len(pending) > 0:
+                utils.delay(self.poll_interval)
+        return [done[uuid] for uuid in uuids]
+
+    def _settle(self, job):
+        """
+        Remove item that terminated job changed from cache.
+        """
+        if self.client.cache is None or "itemUUID" not in job:
+            return
+        try:
+            resource_type = ResourceType(job.get("itemType"))
+            client = client_for(resource_type, self.client)
+        except (ValueError, exceptions.FCOError):
+            return
+        client._invalidate(job.monitored_item_uuid)
 
+    @tracing.traced
     def delete(self, uuid, cascade=False):
         """
         Delete job.
@@ -60,3 +128,192 @@ class JobClient(BaseClient):
         endpoint = "{}/{}".format(self.endpoint, uuid)
         data = {"cascade": False}
         self.client.delete(endpoint, data, codes.ok)
+
+    @tracing.traced
+    def purge(self, older_than=None, statuses=None, max_workers=8,
+              page_size=100, progress=None):
+        """
+        Delete terminated jobs.
+
+        Matching jobs are retrieved page by page and each page is deleted
+        using a pool of concurrent workers before the next page is
+        requested, which means that memory consumption does not depend on
+        the number of jobs being purged.
+
+        Args:
+            older_than (float): Only delete jobs that terminated more than
+                ``older_than`` seconds ago. If ``None``, age is ignored.
+            statuses: Iterable of terminal :obj:`JobStatus` values that
+                should be purged (default: all terminal statuses).
+            max_workers (int): Number of concurrent delete requests.
+            page_size (int): Number of jobs to retrieve in single request.
+            progress: Callable that is called after each page with number of
+                deleted jobs and number of seconds elapsed so far.
+
+        Returns:
+            Number of deleted jobs.
+
+        Raises:
+            FCOError: If non-terminal status is requested or if some of the
+                jobs could not be deleted.
+        """
+        if statuses is None:
+            statuses = [s for s in JobStatus if s.is_terminal]
+        statuses = list(statuses)
+        if not all(s.is_terminal for s in statuses):
+            raise exceptions.FCOError("Only terminated jobs can be purged")
+
+        conditions = dict(status=[s.value for s in statuses])
+        deadline = None if older_than is None else time.time() - older_than
+        started = time.time()
+        deleted = 0
+        errors = []
+        # Deleted jobs disappear from listing, so only jobs that were kept
+        # (too young or failed to delete) shift the start of the next page.
+        kept = 0
+
+        with futures.ThreadPoolExecutor(max_workers) as executor:
+            while True:
+                page = self._list_page(kept, page_size, conditions)
+                selected = [j for j in page if self._ended_before(j, deadline)]
+                kept += len(page) - len(selected)
+                fs = [executor.submit(self.delete, j.uuid) for j in selected]
+                for f in futures.as_completed(fs):
+                    try:
+                        f.result()
+                        deleted += 1
+                    except exceptions.FCOError as e:
+                        errors.append(e)
+                        kept += 1
+                if progress is not None:
+                    progress(deleted, time.time() - started)
+                if len(page) < page_size:
+                    break
+
+        if len(errors) > 0:
+            msg = "Failed to delete {} job(s): {}".format(len(errors),
+                                                          errors[0])
+            raise exceptions.FCOError(msg)
+        return deleted
+
+    @staticmethod
+    def _ended_before(job, deadline):
+        if deadline is None:
+            return True
+        end_time = job.get("endTime")
+        if end_time is None:
+            return False
+        try:
+            return utils.parse_timestamp(end_time) < deadline
+        except (AttributeError, TypeError, ValueError):
+            msg = "Keeping job {} with invalid end time {!r}"
+            logger.warning(msg.format(job.uuid, end_time))
+            return False
+
+
+class JobPoller(object):
+    """
+    Background poller that waits for many jobs at once.
+
+    Threads that wait for jobs register them with the poller and block until
+    the job terminates. Single background thread polls all registered jobs
+    with one list request per polling round, no matter how many threads are
+    waiting. Failed polling rounds are retried in the next round, pending
+    jobs fail only after ``max_failures`` consecutive rounds fail.
+    """
+
+    def __init__(self, client, interval=5, max_failures=5):
+        """
+        Construct job poller.
+
+        Args:
+            client (:obj:`JobClient`): Client that is used to query jobs.
+            interval (float): Number of seconds between polling rounds.
+            max_failures (int): Number of consecutive failed polling rounds
+                that fail all pending jobs.
+        """
+        self.client = client
+        self.interval = interval
+        self.max_failures = max_failures
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def wait(self, uuid):
+        """
+        Wait for job to terminate.
+
+        Args:
+            uuid: Job to wait for
+
+        Returns:
+            :obj:`Job`: Terminated job.
+        """
+        return self.submit(uuid).result()
+
+    def submit(self, uuid):
+        """
+        Register job with the poller.
+
+        Args:
+            uuid: Job to wait for
+
+        Returns:
+            Future that will hold terminated job.
+        """
+        with self._lock:
+            future = self._pending.get(uuid)
+            if future is None:
+                future = self._pending[uuid] = futures.Future()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name="fco-job-poller")
+                self._thread.daemon = True
+                self._thread.start()
+        self._wakeup.set()
+        return future
+
+    def _run(self):
+        failures = 0
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            with self._lock:
+                pending = dict(self._pending)
+            if len(pending) == 0:
+                continue
+
+            try:
+                self._poll(pending)
+                failures = 0
+            except Exception as e:
+                failures += 1
+                if failures < self.max_failures:
+                    msg = "Polling jobs failed ({}/{}): {}"
+                    logger.warning(msg.format(failures, self.max_failures, e))
+                else:
+                    failures = 0
+                    self._resolve(pending, lambda f: f.set_exception(e))
+            utils.delay(self.interval)
+            self._wakeup.set()
+
+    def _poll(self, pending):
+        jobs = self.client.list(len(pending), uuid=sorted(pending))
+        done = {j.uuid: j for j in jobs if j.status.is_terminal}
+        missing = set(pending) - set(j.uuid for j in jobs)
+        for uuid in missing:
+            error = exceptions.NoSuchResourceError(dict(uuid=uuid))
+            self._resolve({uuid: pending[uuid]},
+                          lambda f: f.set_exception(error))
+        for uuid, job in done.items():
+            self.client._settle(job)
+            self._resolve({uuid: pending[uuid]},
+                          lambda f: f.set_result(job))
+
+    def _resolve(self, pending, action):
+        with self._lock:
+            for uuid in pending:
+                self._pending.pop(uuid, None)
+        for future in pending.values():
+            action(future)
@@ -17,7 +17,9 @@
 Module with network related functionality.
 """
 
-from fcoclient.resources.base import BaseClient, Resource, ResourceType
+from fcoclient.resources.base import (
+    BaseClient, Relation, Resource, ResourceType
+)
 
 
 class Network(Resource):
@@ -26,6 +28,9 @@ class Network(Resource):
     """
 
     resource_type = ResourceType.network
+    relations = dict(
+        vdc=Relation(ResourceType.vdc, "vdcUUID"),
+    )
 
 
 class NetworkClient(BaseClient):
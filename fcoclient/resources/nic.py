@@ -17,10 +17,12 @@
 Module with network interface related functionality.
 """
 
-from requests import codes
-
-from fcoclient.resources.base import BaseClient, Resource, ResourceType
+from fcoclient import tracing
+from fcoclient.resources.base import (
+    BaseClient, Relation, Resource, ResourceType
+)
 from fcoclient.resources.job import Job
+from fcoclient.utils import codes
 
 
 class Nic(Resource):
@@ -29,6 +31,11 @@ class Nic(Resource):
     """
 
     resource_type = ResourceType.nic
+    relations = dict(
+        network=Relation(ResourceType.network, "networkUUID"),
+        server=Relation(ResourceType.server, "serverUUID"),
+        vdc=Relation(ResourceType.vdc, "vdcUUID"),
+    )
 
     @staticmethod
     def skeleton():
@@ -58,7 +65,9 @@ class NicClient(BaseClient):
     """
 
     klass = Nic
+    parent = "server"
 
+    @tracing.traced
     def create(self, skeleton):
         """
         Create new network interface.
@@ -73,4 +82,5 @@ class NicClient(BaseClient):
            :obj:`Job`: New job, describing creation progress.
         """
         data = dict(skeletonNIC=skeleton)
+        self._invalidate_parent(skeleton)
         return Job(self.client.post(self.endpoint, data, codes.accepted))
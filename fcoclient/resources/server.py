@@ -19,12 +19,14 @@ Module with server related functionality.
 
 import enum
 
-from requests import codes
-
-from fcoclient.resources.base import BaseClient, Resource, ResourceType
+from fcoclient import tracing
+from fcoclient.resources.base import (
+    BaseClient, Relation, Resource, ResourceType
+)
 from fcoclient.resources.disk import Disk
 from fcoclient.resources.job import Job
 from fcoclient.resources.nic import Nic
+from fcoclient.utils import codes
 
 
 class ServerStatus(enum.Enum):
@@ -44,6 +46,13 @@ class ServerStatus(enum.Enum):
     stopped = "STOPPED"
     stopping = "STOPPING"
 
+    @property
+    def is_transitional(self):
+        return self in (ServerStatus.building, ServerStatus.deleting,
+                        ServerStatus.installing, ServerStatus.migrating,
+                        ServerStatus.rebooting, ServerStatus.starting,
+                        ServerStatus.stopping)
+
 
 class Server(Resource):
     """
@@ -51,6 +60,15 @@ class Server(Resource):
     """
 
     resource_type = ResourceType.server
+    relations = dict(
+        image=Relation(ResourceType.image, "imageUUID"),
+        network=Relation(ResourceType.network, "nics", "networkUUID",
+                         many=True),
+        productoffer=Relation(ResourceType.productoffer, "productOfferUUID"),
+        sshkey=Relation(ResourceType.sshkey, "sshkeys", "resourceUUID",
+                        many=True),
+        vdc=Relation(ResourceType.vdc, "vdcUUID"),
+    )
 
     @staticmethod
     def skeleton():
@@ -85,6 +103,10 @@ class Server(Resource):
     def status(self):
         return ServerStatus(self["status"])
 
+    @property
+    def settled(self):
+        return "status" not in self or not self.status.is_transitional
+
 
 class ServerClient(BaseClient):
     """
@@ -93,6 +115,7 @@ class ServerClient(BaseClient):
 
     klass = Server
 
+    @tracing.traced
     def create(self, skeleton, ssh_key_uuids):
         """
         Create new server.
@@ -110,6 +133,7 @@ class ServerClient(BaseClient):
         data = dict(skeletonServer=skeleton, sshKeyUUIDList=ssh_key_uuids)
         return Job(self.client.post(self.endpoint, data, codes.accepted))
 
+    @tracing.traced
     def start(self, uuid):
         """
         Start server.
@@ -122,8 +146,10 @@ class ServerClient(BaseClient):
         """
         endpoint = "{}/{}/change_status".format(self.endpoint, uuid)
         data = dict(newStatus=ServerStatus.running.value, safe=True)
+        self._invalidate(uuid)
         return Job(self.client.put(endpoint, data, codes.accepted))
 
+    @tracing.traced
     def stop(self, uuid):
         """
         Stop server.
@@ -136,4 +162,5 @@ class ServerClient(BaseClient):
         """
         endpoint = "{}/{}/change_status".format(self.endpoint, uuid)
         data = dict(newStatus=ServerStatus.stopped.value, safe=True)
+        self._invalidate(uuid)
         return Job(self.client.put(endpoint, data, codes.accepted))
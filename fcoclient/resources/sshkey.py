@@ -17,10 +17,10 @@
 Module with ssh key related functionality.
 """
 
-from requests import codes
-
+from fcoclient import tracing
 from fcoclient.resources.base import BaseClient, Resource, ResourceType
 from fcoclient.resources.job import Job
+from fcoclient.utils import codes
 
 
 class SshKey(Resource):
@@ -62,6 +62,7 @@ class SshKeyClient(BaseClient):
 
     klass = SshKey
 
+    @tracing.traced
     def create(self, skeleton):
         """
         Create new SSH key.
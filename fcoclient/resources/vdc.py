@@ -17,7 +17,21 @@
 Module with virtual data center related functionality.
 """
 
-from fcoclient.resources.base import BaseClient, Resource, ResourceType
+import time
+
+from concurrent import futures
+
+from fcoclient import tracing
+from fcoclient.resources.base import (
+    BaseClient, Resource, ResourceType, client_for
+)
+
+SNAPSHOT_TYPES = (
+    ResourceType.server, ResourceType.disk, ResourceType.nic,
+    ResourceType.network, ResourceType.image, ResourceType.sshkey,
+    ResourceType.firewalltemplate,
+)
+"""Types of resources that are part of the VDC snapshot."""
 
 
 class Vdc(Resource):
@@ -28,9 +42,122 @@ class Vdc(Resource):
     resource_type = ResourceType.vdc
 
 
+class VdcSnapshot(object):
+    """
+    Topology of virtual data center at a point in time.
+
+    Resources are linked using their relations: related resources that are
+    part of the snapshot are stored in :attr:`Resource.related` and listed in
+    :attr:`links`.
+    """
+
+    def __init__(self, vdc, resources, taken=None):
+        """
+        Construct snapshot and link its resources.
+
+        Args:
+            vdc (:obj:`Vdc`): Virtual data center.
+            resources: Dictionary that maps :obj:`ResourceType` to lists of
+                resources.
+            taken (float): Time when resources were retrieved (default:
+                now).
+        """
+        self.vdc = vdc
+        self.resources = resources
+        self.taken = time.time() if taken is None else taken
+        self.links = self._link()
+        """list: Links with ``source``, ``relation`` and ``target`` UUIDs."""
+
+    def _link(self):
+        index = {r.uuid: r for items in self.resources.values()
+                 for r in items}
+        index[self.vdc.uuid] = self.vdc
+        links = []
+        for resource_type in sorted(self.resources, key=lambda t: t.value):
+            for resource in self.resources[resource_type]:
+                for name, relation in sorted(resource.relations.items()):
+                    found = {}
+                    for uuid in relation.uuids(resource):
+                        if uuid in index and uuid not in found:
+                            found[uuid] = index[uuid]
+                            links.append(dict(source=resource.uuid,
+                                              relation=name, target=uuid))
+                    resource.related[name] = relation.resolve(resource, found)
+        return links
+
+    def to_dict(self):
+        """
+        Convert snapshot into a single JSON serializable document.
+        """
+        return dict(
+            vdc=self.vdc, taken=self.taken, links=self.links,
+            resources={t.name: items for t, items in self.resources.items()},
+        )
+
+    def records(self):
+        """
+        Convert snapshot into a sequence of JSON serializable records.
+
+        First record describes the VDC, then come resources and links. Each
+        record has a ``kind`` field (``vdc``, ``resource`` or ``link``).
+        """
+        yield dict(kind="vdc", taken=self.taken, resource=self.vdc)
+        for resource_type in sorted(self.resources, key=lambda t: t.value):
+            for resource in self.resources[resource_type]:
+                yield dict(kind="resource", type=resource_type.name,
+                           resource=resource)
+        for link in self.links:
+            yield dict(kind="link", **link)
+
+
 class VdcClient(BaseClient):
     """
     Client providing access to virtual data centers.
     """
 
     klass = Vdc
+
+    @tracing.traced
+    def snapshot(self, uuid, max_workers=len(SNAPSHOT_TYPES), page_size=100):
+        """
+        Retrieve everything that resides in virtual data center.
+
+        Each type of resources is listed by its own worker, so the snapshot
+        takes about as long as listing the most numerous type. SSH keys and
+        firewall templates do not belong to a VDC: snapshot contains SSH keys
+        that VDC servers use (retrieved by UUID once servers are known) and
+        all firewall templates of the customer.
+
+        Args:
+            uuid (str): UUID of the virtual data center.
+            max_workers (int): Number of concurrent list requests.
+            page_size (int): Number of resources to retrieve in single
+                request.
+
+        Returns:
+            :obj:`VdcSnapshot`: Linked snapshot of the VDC.
+
+        Raises:
+            NoSuchResourceError: If VDC does not exist.
+        """
+        vdc = self.get(uuid=uuid)
+        taken = time.time()
+        with futures.ThreadPoolExecutor(max_workers) as executor:
+            fs = {t: executor.submit(self._collect, t, uuid, page_size)
+                  for t in SNAPSHOT_TYPES if t != ResourceType.sshkey}
+            resources = {t: f.result() for t, f in fs.items()}
+
+        servers = resources[ResourceType.server]
+        client_for(ResourceType.server, self.client)._include(servers,
+                                                              ["sshkey"])
+        keys = {k.uuid: k for s in servers for k in s.related["sshkey"]}
+        resources[ResourceType.sshkey] = sorted(keys.values(),
+                                                key=lambda k: k.name)
+        return VdcSnapshot(vdc, resources, taken)
+
+    def _collect(self, resource_type, uuid, page_size):
+        conditions = {}
+        if resource_type != ResourceType.firewalltemplate:
+            conditions["vdcUUID"] = uuid
+        client = client_for(resource_type, self.client)
+        return list(client.iterate(page_size, **conditions))
@@ -0,0 +1,174 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module with client-side cascade deletion of resources.
+
+FCO can delete dependent resources by itself (``cascade=True``), but it does
+so one resource at a time. Teardown planner discovers dependent resources,
+groups them into stages that can be safely deleted in parallel and executes
+those stages one after another.
+"""
+
+from concurrent import futures
+
+from fcoclient.exceptions import FCOError
+from fcoclient.resources.base import ResourceType
+
+
+class TeardownPlan(object):
+    """
+    Ordered list of deletion stages.
+
+    Resources in single stage do not depend on each other and can be deleted
+    concurrently. Stage can only be processed after all deletions from
+    previous stage terminated.
+    """
+
+    def __init__(self, stages):
+        """
+        Construct teardown plan.
+
+        Args:
+            stages: List of lists of resources. Empty stages are dropped.
+        """
+        self.stages = [stage for stage in stages if len(stage) > 0]
+        """list: Stages of resources that should be deleted."""
+
+    def __iter__(self):
+        return iter(self.stages)
+
+    def __len__(self):
+        return sum(len(stage) for stage in self.stages)
+
+
+class TeardownPlanner(object):
+    """
+    Planner that deletes resources together with their dependents.
+
+    Dependencies are discovered as follows:
+
+      * VDC depends on all servers, disks, network interfaces, networks and
+        images that reside in it.
+      * Server depends on its disks and network interfaces.
+      * Network depends on network interfaces that are attached to it.
+
+    Dependent resources are deleted before resources that they depend on.
+    """
+
+    def __init__(self, client, max_workers=8, page_size=100):
+        """
+        Construct teardown planner.
+
+        Args:
+            client (:obj:`Client`): Client that is used to access FCO.
+            max_workers (int): Maximum number of concurrent delete requests.
+            page_size (int): Number of resources to retrieve in single list
+                request when discovering dependents.
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self.page_size = page_size
+
+    def plan(self, resource_type, uuid):
+        """
+        Discover dependents of the resource and create teardown plan.
+
+        Args:
+            resource_type (:obj:`ResourceType`): Type of the root resource.
+            uuid (str): UUID of the root resource.
+
+        Returns:
+            :obj:`TeardownPlan`: Plan that deletes root resource last.
+        """
+        root = self._client_for(resource_type).get(uuid=uuid)
+
+        if resource_type == ResourceType.vdc:
+            # SSH keys and firewall templates belong to the customer, not to
+            # the VDC, so they survive its teardown.
+            return TeardownPlan([
+                self._find(ResourceType.server, vdcUUID=uuid),
+                self._find(ResourceType.disk, vdcUUID=uuid) +
+                self._find(ResourceType.nic, vdcUUID=uuid),
+                self._find(ResourceType.network, vdcUUID=uuid) +
+                self._find(ResourceType.image, vdcUUID=uuid),
+                [root],
+            ])
+        if resource_type == ResourceType.server:
+            return TeardownPlan([
+                [root],
+                self._find(ResourceType.disk, serverUUID=uuid) +
+                self._find(ResourceType.nic, serverUUID=uuid),
+            ])
+        if resource_type == ResourceType.network:
+            return TeardownPlan([
+                self._find(ResourceType.nic, networkUUID=uuid),
+                [root],
+            ])
+        return TeardownPlan([[root]])
+
+    def execute(self, plan):
+        """
+        Delete resources from plan.
+
+        Deletions within a stage are submitted concurrently, using at most
+        ``max_workers`` parallel requests. Jobs of the whole stage are then
+        waited for together.
+
+        Args:
+            plan (:obj:`TeardownPlan`): Plan to execute.
+
+        Returns:
+            List of terminated deletion jobs.
+
+        Raises:
+            FCOError: If any of the deletions in a stage failed. Stages after
+                failed one are not executed.
+        """
+        jobs = []
+        for stage in plan:
+            stage_jobs, errors = self._submit(stage)
+            stage_jobs = self.client.job.wait_all([j.uuid for j in stage_jobs])
+            jobs.extend(stage_jobs)
+            errors.extend(job["info"] for job in stage_jobs
+                          if job.status.marks_failure)
+            if len(errors) > 0:
+                raise FCOError("Teardown failed: {}".format("; ".join(
+                    str(e) for e in errors
+                )))
+        return jobs
+
+    def _submit(self, stage):
+        jobs = []
+        errors = []
+        with futures.ThreadPoolExecutor(self.max_workers) as executor:
+            fs = [executor.submit(self._delete, r) for r in stage]
+            for f in futures.as_completed(fs):
+                try:
+                    jobs.append(f.result())
+                except FCOError as e:
+                    errors.append(e)
+        return jobs, errors
+
+    def _delete(self, resource):
+        client = self._client_for(resource.resource_type)
+        return client.delete(resource.uuid)
+
+    def _find(self, resource_type, **conditions):
+        client = self._client_for(resource_type)
+        return list(client.iterate(self.page_size, **conditions))
+
+    def _client_for(self, resource_type):
+        return getattr(self.client, resource_type.name)
@@ -0,0 +1,324 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module with optional tracing of client operations.
+
+Resource client methods and API calls are wrapped in nested spans that
+carry attributes like resource type, UUID and job status. By default,
+:obj:`NoopTracer` is installed and tracing costs a single attribute check
+per call. Spans are nested per thread, which means that work done in thread
+pools starts new traces.
+
+Span objects follow the OpenTelemetry naming (``set_attribute``,
+``record_exception``), so :obj:`OpenTelemetryTracer` can hand out native
+OpenTelemetry spans.
+"""
+
+from __future__ import print_function
+
+import contextlib
+import functools
+import json
+import random
+import sys
+import threading
+import time
+
+from fcoclient.exceptions import FCOError
+
+try:
+    _string_types = (basestring,)  # noqa: F821
+except NameError:
+    _string_types = (str,)
+
+
+class Span(object):
+    """
+    Timed operation.
+    """
+
+    def __init__(self, name, parent, attributes):
+        self.name = name
+        self.parent = parent
+        self.trace_id = ("{:032x}".format(random.getrandbits(128))
+                         if parent is None else parent.trace_id)
+        self.span_id = "{:016x}".format(random.getrandbits(64))
+        self.attributes = attributes
+        self.children = []
+        self.dropped_children = 0
+        self.error = None
+        self.start = time.time()
+        self.end = None
+
+    @property
+    def duration(self):
+        """
+        Duration of the span in seconds.
+        """
+        return (self.end or time.time()) - self.start
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_exception(self, exception):
+        self.error = "{}: {}".format(type(exception).__name__, exception)
+
+    def to_dict(self):
+        return dict(
+            name=self.name,
+            trace_id=self.trace_id,
+            span_id=self.span_id,
+            parent_id=None if self.parent is None else self.parent.span_id,
+            start=self.start,
+            duration_ms=self.duration * 1000,
+            attributes=self.attributes,
+            error=self.error,
+        )
+
+
+class _NoopSpan(object):
+
+    def set_attribute(self, key, value):
+        pass
+
+    def record_exception(self, exception):
+        pass
+
+
+class NoopTracer(object):
+    """
+    Tracer that does nothing.
+    """
+
+    enabled = False
+    _span = _NoopSpan()
+
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        yield self._span
+
+    def close(self):
+        pass
+
+
+class Tracer(object):
+    """
+    Tracer that passes finished spans to exporters.
+
+    Each span is exported as soon as it ends. Spans also keep references to
+    their first ``max_children`` children, so that exporters can output
+    whole trees, and only count the rest. This keeps memory bounded during
+    long polling loops.
+    """
+
+    enabled = True
+    max_children = 1000
+    """int: Maximum number of children that span keeps references to."""
+
+    def __init__(self, *exporters):
+        """
+        Construct tracer.
+
+        Args:
+            *exporters: Objects with ``export(span)`` method that is called
+                when span ends.
+        """
+        self.exporters = exporters
+        self._local = threading.local()
+
+    @property
+    def current(self):
+        """
+        Innermost active span of the calling thread.
+        """
+        return getattr(self._local, "span", None)
+
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        """
+        Create span that covers body of the with statement.
+
+        Args:
+            name (str): Name of the span.
+            **attributes: Initial span attributes.
+
+        Yields:
+            :obj:`Span`: Active span.
+        """
+        parent = self.current
+        span = Span(name, parent, attributes)
+        if parent is not None:
+            if len(parent.children) < self.max_children:
+                parent.children.append(span)
+            else:
+                parent.dropped_children += 1
+        self._local.span = span
+        try:
+            yield span
+        except Exception as e:
+            span.record_exception(e)
+            raise
+        finally:
+            span.end = time.time()
+            self._local.span = parent
+            for exporter in self.exporters:
+                exporter.export(span)
+
+    def close(self):
+        """
+        Close exporters that hold resources (for example, files).
+        """
+        for exporter in self.exporters:
+            if hasattr(exporter, "close"):
+                exporter.close()
+
+
+class OpenTelemetryTracer(object):
+    """
+    Tracer that creates OpenTelemetry spans.
+
+    Configuring OpenTelemetry SDK (providers, processors and exporters) is
+    left to the application.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise FCOError("OpenTelemetry API is not installed")
+        self._tracer = trace.get_tracer("fcoclient")
+
+    def span(self, name, **attributes):
+        return self._tracer.start_as_current_span(name, attributes=attributes)
+
+    def close(self):
+        pass
+
+
+class ConsoleExporter(object):
+    """
+    Exporter that prints finished traces as indented trees.
+    """
+
+    def __init__(self, file=sys.stderr):
+        self.file = file
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        if span.parent is None:
+            with self._lock:
+                self._print(span, 0)
+
+    def _print(self, span, depth):
+        attributes = " ".join("{}={}".format(k, v) for k, v
+                              in sorted(span.attributes.items()))
+        print("{}{} {:.1f} ms {}{}".format(
+            "  " * depth, span.name, span.duration * 1000, attributes,
+            "" if span.error is None else " ERROR " + span.error
+        ).rstrip(), file=self.file)
+        for child in span.children:
+            self._print(child, depth + 1)
+        if span.dropped_children > 0:
+            print("{}... {} more span(s)".format(
+                "  " * (depth + 1), span.dropped_children
+            ), file=self.file)
+
+
+class FileExporter(object):
+    """
+    Exporter that appends finished spans to file, one JSON document per line.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "a")
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), sort_keys=True, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+tracer = NoopTracer()
+""":obj:`NoopTracer`, :obj:`Tracer` or :obj:`OpenTelemetryTracer` in use."""
+
+
+def set_tracer(new_tracer):
+    """
+    Install tracer.
+
+    Args:
+        new_tracer: Tracer to install. Pass ``None`` to disable tracing.
+    """
+    global tracer
+    tracer = NoopTracer() if new_tracer is None else new_tracer
+
+
+def span(name, **attributes):
+    """
+    Create span using installed tracer.
+
+    Args:
+        name (str): Name of the span.
+        **attributes: Initial span attributes.
+    """
+    return tracer.span(name, **attributes)
+
+
+def traced(func):
+    """
+    Decorator that wraps resource client method in a span.
+
+    Span is named ``<resource type>.<method name>``. String positional
+    argument is recorded as resource UUID and returned resources are
+    described by their UUID and status.
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if not tracer.enabled:
+            return func(self, *args, **kwargs)
+
+        resource_type = self.klass.resource_type.name
+        name = "{}.{}".format(resource_type, func.__name__)
+        with tracer.span(name, resource_type=resource_type) as s:
+            uuid = kwargs.get("uuid")
+            if (uuid is None and len(args) > 0 and
+                    isinstance(args[0], _string_types)):
+                uuid = args[0]
+            if uuid is not None:
+                s.set_attribute("uuid", uuid)
+            result = func(self, *args, **kwargs)
+            _describe(s, result)
+            return result
+    wrapper.__wrapped__ = func  # Not set by functools.wraps on Python 2.
+    return wrapper
+
+
+def _describe(span, result):
+    if isinstance(result, list):
+        span.set_attribute("items", len(result))
+    elif isinstance(result, dict) and "resourceUUID" in result:
+        prefix = result.resource_type.name
+        span.set_attribute(prefix + ".uuid", result.uuid)
+        if "status" in result:
+            span.set_attribute(prefix + ".status", str(result["status"]))
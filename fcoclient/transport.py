@@ -0,0 +1,595 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Module with transports that deliver requests to FCO.
+
+Transport takes method, URL and JSON payload and returns response object
+that has ``status_code``, ``content``, ``text``, ``request.body``,
+``json()``, ``iter_content()`` and ``close()`` members (a subset of
+:class:`requests.Response`). Besides the
+default transport that uses requests library, there is a cheaper transport
+built directly on urllib3, an HTTP/2 capable transport that uses httpx and
+transports that record traffic into a file and replay recorded traffic
+without contacting FCO.
+
+Recordings are files with one JSON document per line (gzip compressed if
+file name ends with ``.gz``). Recorded URLs only contain path and values of
+fields that look like credentials are replaced by ``*****``.
+"""
+
+import collections
+import json
+import re
+import threading
+import time
+import weakref
+
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
+
+from fcoclient import exceptions
+
+SCRUB_RE = re.compile(r"password|secret|token|private", re.I)
+"""Fields whose names match this expression are not recorded."""
+
+SCRUBBED = "*****"
+
+DEFAULT_TIMEOUT = (5, 60)
+"""Default connect and read timeouts in seconds."""
+
+
+class Transport(object):
+    """
+    Base class for transports.
+    """
+
+    def send(self, method, url, data, profiler=None, stream=False):
+        """
+        Send request.
+
+        Args:
+            method (str): HTTP method.
+            url (str): Full URL of the endpoint.
+            data: JSON serializable payload or ``None``.
+            profiler (:obj:`Profiler`): Profiler that should receive
+                timings or ``None``.
+            stream (bool): If True, response body may be left unread until
+                it is consumed using ``iter_content``. Transports that need
+                the whole body are free to read it anyway.
+
+        Returns:
+            Response object.
+
+        Raises:
+            APIConnectionError: If response could not be obtained.
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """
+        Release resources held by transport.
+        """
+
+
+class RequestsTransport(Transport):
+    """
+    Transport that uses requests library.
+
+    Each thread gets its own http session (and with it its own connection
+    pool), which means that requests do not need to acquire any locks.
+    Requests library is only imported when the first session is created.
+    """
+
+    def __init__(self, auth, verify, timeout=DEFAULT_TIMEOUT):
+        """
+        Construct transport.
+
+        Args:
+            auth: Tuple with user name and password.
+            verify: Parameter for SSL certificate validation.
+            timeout: Number of seconds or a tuple with connect and read
+                timeouts. Read timeout limits time between received bytes,
+                not time needed to receive the whole response.
+        """
+        self.auth = auth
+        self.verify = verify
+        self.timeout = timeout
+        self._local = threading.local()
+        self._sessions = weakref.WeakSet()
+        self._sessions_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """
+        Http session that belongs to the calling thread.
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+
+            session = requests.Session()
+            session.auth = self.auth
+            session.verify = self.verify
+            session.headers["Content-Type"] = "application/json"
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.add(session)
+        return session
+
+    def send(self, method, url, data, profiler=None, stream=False):
+        import requests
+
+        try:
+            if profiler is None:
+                return self.session.request(method, url, json=data,
+                                            timeout=self.timeout,
+                                            stream=stream)
+
+            # Streaming makes request return as soon as headers arrive, which
+            # separates waiting for server from downloading response body.
+            start = time.time()
+            response = self.session.request(method, url, json=data,
+                                            timeout=self.timeout, stream=True)
+            headers = time.time()
+            profiler.add("wait", headers - start)
+            if not stream:
+                response.content
+                profiler.add("download", time.time() - headers)
+            return response
+        except requests.RequestException as e:
+            raise exceptions.APIConnectionError(e)
+
+    def close(self):
+        """
+        Close http sessions of all threads.
+
+        Transport can still be used after it has been closed, new sessions
+        are created on demand.
+        """
+        with self._sessions_lock:
+            sessions = list(self._sessions)
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+        self._local = threading.local()
+
+
+class _Request(object):
+
+    def __init__(self, body):
+        self.body = body
+
+
+def _split_timeout(timeout):
+    if isinstance(timeout, (tuple, list)):
+        return timeout[0], timeout[1]
+    return timeout, timeout
+
+
+def _encode(data):
+    return None if data is None else json.dumps(data).encode("utf-8")
+
+
+class Urllib3Transport(Transport):
+    """
+    Transport that uses urllib3 directly.
+
+    Skipping the session machinery of requests library (hooks, adapters,
+    header and settings merging) makes each call noticeably cheaper, which
+    matters when doing many small calls like job polls. Connection pool is
+    thread-safe and shared by all threads.
+    """
+
+    def __init__(self, auth, verify, timeout=DEFAULT_TIMEOUT, pool_size=10):
+        """
+        Construct transport.
+
+        Args:
+            auth: Tuple with user name and password.
+            verify: Parameter for SSL certificate validation.
+            timeout: Number of seconds or a tuple with connect and read
+                timeouts.
+            pool_size (int): Number of connections that are kept open.
+        """
+        import urllib3
+
+        connect, read = _split_timeout(timeout)
+        kwargs = dict(cert_reqs="CERT_NONE")
+        if verify:
+            kwargs = dict(cert_reqs="CERT_REQUIRED")
+            if verify is not True:
+                kwargs["ca_certs"] = verify
+            else:
+                try:
+                    import certifi
+                    kwargs["ca_certs"] = certifi.where()
+                except ImportError:
+                    pass
+        self.pool = urllib3.PoolManager(
+            maxsize=pool_size, retries=False,
+            timeout=urllib3.Timeout(connect=connect, read=read), **kwargs
+        )
+        self.headers = urllib3.make_headers(basic_auth=":".join(auth))
+        self.headers["Content-Type"] = "application/json"
+
+    def send(self, method, url, data, profiler=None, stream=False):
+        import urllib3
+
+        body = _encode(data)
+        try:
+            start = time.time()
+            response = self.pool.urlopen(method, url, body=body,
+                                         headers=self.headers,
+                                         preload_content=False)
+            headers = time.time()
+            result = _Urllib3Response(response, body)
+            if not stream:
+                result.content
+            if profiler is not None:
+                profiler.add("wait", headers - start)
+                if not stream:
+                    profiler.add("download", time.time() - headers)
+            return result
+        except urllib3.exceptions.HTTPError as e:
+            raise exceptions.APIConnectionError(e)
+
+    def close(self):
+        self.pool.clear()
+
+
+class _Urllib3Response(object):
+
+    def __init__(self, response, body):
+        self._response = response
+        self._content = None
+        self.status_code = response.status
+        self.headers = response.headers
+        self.request = _Request(body)
+
+    @property
+    def content(self):
+        if self._content is None:
+            import urllib3
+
+            try:
+                self._content = self._response.read()
+            except urllib3.exceptions.HTTPError as e:
+                raise exceptions.APIConnectionError(e)
+            finally:
+                self._response.release_conn()
+        return self._content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size=1):
+        import urllib3
+
+        if self._content is not None:
+            for start in range(0, len(self._content), chunk_size):
+                yield self._content[start:start + chunk_size]
+            return
+        try:
+            for chunk in self._response.stream(chunk_size):
+                yield chunk
+        except urllib3.exceptions.HTTPError as e:
+            raise exceptions.APIConnectionError(e)
+        finally:
+            self._response.release_conn()
+
+    def close(self):
+        self._response.release_conn()
+
+
+class HttpxTransport(Transport):
+    """
+    Transport that uses httpx library and can talk HTTP/2.
+
+    With HTTP/2, concurrent calls from all threads are multiplexed over a
+    single connection. Transport needs ``httpx`` library (and ``h2`` for
+    HTTP/2, ``pip install httpx[http2]``) that is not installed with
+    fcoclient.
+    """
+
+    def __init__(self, auth, verify, timeout=DEFAULT_TIMEOUT, http2=True):
+        """
+        Construct transport.
+
+        Args:
+            auth: Tuple with user name and password.
+            verify: Parameter for SSL certificate validation.
+            timeout: Number of seconds or a tuple with connect and read
+                timeouts.
+            http2 (bool): Use HTTP/2 if server supports it.
+
+        Raises:
+            FCOError: If needed libraries are not installed.
+        """
+        try:
+            import httpx
+
+            connect, read = _split_timeout(timeout)
+            self.client = httpx.Client(
+                auth=auth, verify=verify, http2=http2,
+                timeout=httpx.Timeout(read, connect=connect),
+                headers={"Content-Type": "application/json"},
+            )
+        except ImportError:
+            raise exceptions.FCOError(
+                "HTTP/2 transport requires httpx[http2] package"
+            )
+
+    def send(self, method, url, data, profiler=None, stream=False):
+        import httpx
+
+        body = _encode(data)
+        try:
+            start = time.time()
+            response = self.client.send(
+                self.client.build_request(method, url, content=body),
+                stream=True,
+            )
+            headers = time.time()
+            result = _HttpxResponse(response, body)
+            if not stream:
+                result.content
+            if profiler is not None:
+                profiler.add("wait", headers - start)
+                if not stream:
+                    profiler.add("download", time.time() - headers)
+            return result
+        except httpx.HTTPError as e:
+            raise exceptions.APIConnectionError(e)
+
+    def close(self):
+        self.client.close()
+
+
+class _HttpxResponse(object):
+
+    def __init__(self, response, body):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.request = _Request(body)
+
+    @property
+    def content(self):
+        import httpx
+
+        try:
+            return self._response.read()
+        except httpx.HTTPError as e:
+            raise exceptions.APIConnectionError(e)
+        finally:
+            self._response.close()
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size=1):
+        import httpx
+
+        try:
+            for chunk in self._response.iter_bytes(chunk_size):
+                yield chunk
+        except httpx.HTTPError as e:
+            raise exceptions.APIConnectionError(e)
+        finally:
+            self._response.close()
+
+    def close(self):
+        self._response.close()
+
+
+class RecordedResponse(object):
+    """
+    Response that was recorded earlier.
+    """
+
+    def __init__(self, status_code, text, request_body=None):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.request = _Request(request_body)
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+def scrub(data):
+    """
+    Replace values of credential-like fields in JSON data.
+
+    Args:
+        data: Decoded JSON data.
+
+    Returns:
+        Scrubbed copy of data.
+    """
+    if isinstance(data, dict):
+        return {k: SCRUBBED if SCRUB_RE.search(k) else scrub(v)
+                for k, v in data.items()}
+    if isinstance(data, list):
+        return [scrub(v) for v in data]
+    return data
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        import gzip
+
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+class RecordingTransport(Transport):
+    """
+    Transport that records traffic that passes through another transport.
+    """
+
+    def __init__(self, transport, path):
+        """
+        Construct recording transport.
+
+        Args:
+            transport (:obj:`Transport`): Transport that sends requests.
+            path (str): File that recorded traffic is appended to.
+        """
+        self.transport = transport
+        self.path = path
+        try:
+            self._file = _open(path, "ab")
+        except IOError as e:
+            raise exceptions.FCOError("Cannot open recording: {}".format(e))
+        self._lock = threading.Lock()
+
+    def send(self, method, url, data, profiler=None, stream=False):
+        record = dict(method=method, path=urlparse(url).path,
+                      request=scrub(data))
+        start = time.time()
+        try:
+            response = self.transport.send(method, url, data, profiler)
+        except exceptions.APIConnectionError as e:
+            record.update(elapsed=time.time() - start, error=str(e))
+            self._write(record)
+            raise
+
+        record.update(elapsed=time.time() - start,
+                      status=response.status_code, response=response.text)
+        try:
+            record["response"] = json.dumps(scrub(response.json()))
+        except ValueError:
+            pass
+        self._write(record)
+        return response
+
+    def _write(self, record):
+        line = json.dumps(record, sort_keys=True) + "\n"
+        with self._lock:
+            self._file.write(line.encode("utf-8"))
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+        self.transport.close()
+
+
+class ReplayTransport(Transport):
+    """
+    Transport that serves previously recorded responses.
+
+    Requests are matched by method, path and payload. Identical requests
+    receive recorded responses in recorded order, with the last one being
+    repeated once they run out. This makes job polling behave the same way
+    as it did during recording.
+    """
+
+    def __init__(self, path, latency_scale=1.0):
+        """
+        Load recording.
+
+        Args:
+            path (str): File with recorded traffic.
+            latency_scale (float): Factor that recorded latencies are
+                multiplied by. Use 0 to respond immediately.
+        """
+        self.latency_scale = latency_scale
+        self._records = collections.defaultdict(collections.deque)
+        self._lock = threading.Lock()
+        try:
+            with _open(path, "rb") as f:
+                for line in f:
+                    record = json.loads(line.decode("utf-8"))
+                    key = self._key(record["method"], record["path"],
+                                    record["request"])
+                    self._records[key].append(record)
+        except (IOError, ValueError, KeyError) as e:
+            raise exceptions.FCOError("Cannot load recording: {}".format(e))
+
+    @staticmethod
+    def _key(method, path, data):
+        return method, path, json.dumps(data, sort_keys=True)
+
+    def send(self, method, url, data, profiler=None, stream=False):
+        path = urlparse(url).path
+        key = self._key(method, path, scrub(data))
+        with self._lock:
+            records = self._records.get(key)
+            if not records:
+                msg = "No recorded response for {} {}".format(method, path)
+                raise exceptions.APIConnectionError(msg)
+            record = records.popleft() if len(records) > 1 else records[0]
+
+        delay = record["elapsed"] * self.latency_scale
+        if delay > 0:
+            time.sleep(delay)
+        if profiler is not None:
+            profiler.add("wait", delay)
+        if "error" in record:
+            raise exceptions.APIConnectionError(record["error"])
+        body = None if data is None else json.dumps(data).encode("utf-8")
+        return RecordedResponse(record["status"], record["response"], body)
+
+
+TRANSPORTS = dict(
+    requests=RequestsTransport,
+    urllib3=Urllib3Transport,
+    http2=HttpxTransport,
+)
+"""Transports that can be selected by name."""
+
+
+def create_transport(name, auth, verify, timeout=DEFAULT_TIMEOUT):
+    """
+    Create transport by name.
+
+    Args:
+        name (str): One of the :data:`TRANSPORTS` keys.
+        auth: Tuple with user name and password.
+        verify: Parameter for SSL certificate validation.
+        timeout: Number of seconds or a tuple with connect and read timeouts.
+
+    Returns:
+        :obj:`Transport`: New transport.
+
+    Raises:
+        FCOError: If transport is not known or cannot be created.
+    """
+    if name not in TRANSPORTS:
+        msg = "Invalid transport: {} (valid transports: {})"
+        raise exceptions.FCOError(
+            msg.format(name, ", ".join(sorted(TRANSPORTS)))
+        )
+    return TRANSPORTS[name](auth, verify, timeout)
@@ -17,11 +17,33 @@
 Module with various utility functions.
 """
 
+import calendar
 import getpass
 import json
+import re
 import sys
 import time
 
+from fcoclient import profiling
+
+
+class codes(object):
+    """
+    HTTP status codes used by FCO API.
+
+    This is a subset of ``requests.codes`` that does not require importing
+    requests.
+    """
+
+    ok = 200
+    accepted = 202
+
+
+_TIMESTAMP_RE = re.compile(
+    r"(\d{4})-(\d\d)-(\d\d)[T ](\d\d):(\d\d):(\d\d)(\.\d+)?"
+    r"(Z|[+-]\d\d:?\d\d)?$"
+)
+
 
 def output_json(data, file=sys.stdout):
     """
@@ -42,7 +64,48 @@ def delay(delay_in_secs=5):
     Args:
         delay_in_secs: Delay in seconds (default: 5)
     """
+    profiler = profiling.profiler
+    if profiler is None:
+        time.sleep(delay_in_secs)
+        return
+
+    start = time.time()
     time.sleep(delay_in_secs)
+    profiler.add("delay", time.time() - start)
+
+
+def parse_timestamp(value):
+    """
+    Convert FCO timestamp into number of seconds since epoch.
+
+    FCO reports timestamps either as number of milliseconds since epoch or as
+    ISO 8601 formatted strings. Strings without time zone are treated as UTC.
+
+    Args:
+        value: Timestamp to convert
+
+    Returns:
+        Number of seconds since epoch (float).
+
+    Raises:
+        ValueError: If value cannot be parsed.
+    """
+    if isinstance(value, (int, float)):
+        return value / 1000.0
+
+    match = _TIMESTAMP_RE.match(value.strip())
+    if match is None:
+        raise ValueError("Invalid timestamp: {}".format(value))
+
+    parts = match.groups()
+    seconds = calendar.timegm(tuple(int(p) for p in parts[:6]))
+    seconds += float(parts[6] or 0)
+    zone = parts[7]
+    if zone is not None and zone != "Z":
+        zone = zone.replace(":", "")
+        offset = int(zone[1:3]) * 3600 + int(zone[3:5]) * 60
+        seconds += -offset if zone[0] == "+" else offset
+    return seconds
 
 
 def prompt(text, is_password=False):
@@ -0,0 +1,85 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+
+import pytest
+
+from fcoclient import Client
+from fcoclient.exceptions import (
+    APIConnectionError, CircuitOpenError, FCOError
+)
+from fcoclient.transport import RecordedResponse, Transport
+
+
+class StubTransport(Transport):
+
+    def __init__(self):
+        self.errors = []
+
+    def send(self, method, url, data, profiler=None, stream=False):
+        if self.errors:
+            raise self.errors.pop(0)
+        return RecordedResponse(200, '{"list": [], "totalCount": 0}')
+
+
+@pytest.fixture
+def client():
+    transport = StubTransport()
+    client = Client("user", "customer", "password", "http://fco",
+                    circuit_breaker=dict(failure_threshold=2,
+                                         reset_timeout=0.05),
+                    transport=transport)
+    return client, transport
+
+
+def _open_circuit(client, transport):
+    transport.errors = [APIConnectionError("down")] * 2
+    for _ in range(2):
+        with pytest.raises(APIConnectionError):
+            client.server.list(1)
+    with pytest.raises(CircuitOpenError):
+        client.server.list(1)
+    time.sleep(0.06)
+
+
+def test_successful_probe_closes_circuit(client):
+    client, transport = client
+    _open_circuit(client, transport)
+    assert client.server.list(1) == []
+    assert client._client.circuit_breaker.states() == {
+        "resources/SERVER/list": "closed",
+    }
+
+
+def test_failed_probe_reopens_circuit(client):
+    client, transport = client
+    _open_circuit(client, transport)
+    transport.errors = [APIConnectionError("still down")]
+    with pytest.raises(APIConnectionError):
+        client.server.list(1)
+    with pytest.raises(CircuitOpenError):
+        client.server.list(1)
+
+
+@pytest.mark.parametrize("error", [FCOError("replay"), TypeError("payload")])
+def test_probe_with_unrelated_error_is_released(client, error):
+    client, transport = client
+    _open_circuit(client, transport)
+    transport.errors = [error]
+    with pytest.raises(type(error)):
+        client.server.list(1)
+    # Next call becomes the probe instead of being rejected forever.
+    assert client.server.list(1) == []
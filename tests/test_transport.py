@@ -0,0 +1,166 @@
+# Copyright (c) 2017 XLAB d.o.o.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import threading
+import uuid as uuidlib
+
+import pytest
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from fcoclient import Client
+
+THREADS = 16
+CALLS = 25
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        data = json.loads(self.rfile.read(length).decode("utf-8"))
+        uuids = [value
+                 for cond in data["searchFilter"]["filterConditions"]
+                 if cond["field"] == "resourceUUID"
+                 for value in cond["value"]]
+        items = [dict(resourceUUID=uuid, resourceName=uuid,
+                      resourceType="SERVER", productOfferUUID="offer",
+                      vdcUUID="vdc", status="RUNNING")
+                 for uuid in uuids]
+        body = json.dumps(dict(list=items, totalCount=len(items)))
+        body = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+    # Threads reconnect all at once after close(), default backlog of 5 makes
+    # kernel reset some of the connections.
+    request_queue_size = 128
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = _Server(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield "http://{}:{}".format(*server.server_address)
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(server):
+    uuids = [str(uuidlib.uuid4()) for _ in range(10)]
+    client = Client("user", "customer", "password", server)
+    yield client, uuids
+    client.close()
+
+
+def _run_threads(target, count=THREADS):
+    start = threading.Event()
+    errors = []
+
+    def run(index):
+        start.wait()
+        try:
+            target(index)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    start.set()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_threads_share_client(client):
+    client, uuids = client
+    results = [[] for _ in range(THREADS)]
+
+    def work(index):
+        for i in range(CALLS):
+            uuid = uuids[(index + i) % len(uuids)]
+            results[index].append(client.server.get(uuid=uuid).uuid)
+
+    _run_threads(work)
+    for index, result in enumerate(results):
+        assert result == [uuids[(index + i) % len(uuids)]
+                          for i in range(CALLS)]
+
+
+def test_each_thread_gets_own_session(client):
+    client, uuids = client
+    transport = client._client.transport
+    sessions = [[] for _ in range(THREADS)]
+
+    def work(index):
+        for _ in range(CALLS // 5):
+            client.server.get(uuid=uuids[0])
+            sessions[index].append(transport.session)
+
+    _run_threads(work)
+    for used in sessions:
+        assert all(s is used[0] for s in used)
+    assert len(set(id(used[0]) for used in sessions)) == THREADS
+    assert len(transport._sessions) == THREADS
+
+
+def test_close_does_not_race_with_session_creation(client):
+    client, uuids = client
+    transport = client._client.transport
+    stop = threading.Event()
+
+    def closer():
+        while not stop.is_set():
+            client.close()
+
+    thread = threading.Thread(target=closer)
+    thread.start()
+    try:
+        def work(index):
+            for _ in range(CALLS):
+                assert client.server.get(uuid=uuids[index % len(uuids)])
+
+        _run_threads(work)
+    finally:
+        stop.set()
+        thread.join()
+
+    client.close()
+    assert len(transport._sessions) == 0
+    # Transport is still usable after it has been closed.
+    assert client.server.get(uuid=uuids[0]).uuid == uuids[0]
+    assert len(transport._sessions) == 1